@@ -0,0 +1,330 @@
+#!/usr/bin/env python3
+"""
+Download benchmarks, run against a local HTTP stand-in so they need no network.
+
+Each scenario runs in a fresh interpreter with an empty cache, and reports
+its wall time, throughput and peak RSS:
+
+    python benchmark/download.py run
+    python benchmark/download.py run --size 512 --scenario segmented
+"""
+
+import json
+import tempfile
+from pathlib import Path
+
+import click
+import harness
+from server import Faults, Server, write_blob, write_manifest, write_zip
+
+mib = 1024 * 1024
+
+
+def build_fixture(root: Path, size: int, plugins: int) -> dict:
+    """
+    Writes the synthetic files served to the scenarios.
+
+    Parameters
+    ----------
+    root : Path
+        Folder the server serves.
+    size : int
+        Size of the plain download, in MiB.
+    plugins : int
+        Number of plugins with a manifest.
+
+    Returns
+    -------
+    dict
+        Checksums and sizes of the files, relative to the server root.
+    """
+
+    files = {"blob.bin": {"sha256": write_blob(root / "blob.bin", size * mib)}}
+    mo2_members = {"ModOrganizer.exe": 8 * mib, "uibase.dll": 4 * mib}
+    mo2_members |= {f"dlls/lib{i}.dll": mib for i in range(24)}
+    mo2_members |= {f"plugins/plugin{i}.dll": 256 * 1024 for i in range(32)}
+    checksum, members = write_zip(root / "mo2.zip", mo2_members, seed=1)
+    files["mo2.zip"] = {"sha256": checksum, "exe": members["ModOrganizer.exe"]}
+    java_members = {"jdk-jre/bin/java.exe": 2 * mib}
+    java_members |= {f"jdk-jre/lib/module{i}.jar": 2 * mib for i in range(12)}
+    checksum, members = write_zip(root / "java.zip", java_members, seed=2)
+    files["java.zip"] = {"sha256": checksum, "exe": members["jdk-jre/bin/java.exe"]}
+    files["winetricks"] = {"sha256": write_blob(root / "winetricks", 512 * 1024, 3)}
+    for i in range(plugins):
+        name = f"plugin{i}"
+        checksum, _ = write_zip(
+            root / "plugins" / f"{name}.zip",
+            {f"{name}/__init__.py": 64 * 1024, f"{name}/data.bin": 2 * mib},
+            seed=10 + i,
+        )
+        files[f"plugins/{name}.zip"] = {"sha256": checksum}
+        write_manifest(
+            root / "manifests" / f"{name}.json",
+            f"{{url}}plugins/{name}.zip",
+            f"{name}/",
+        )
+    for path, info in files.items():
+        info["size"] = (root / path).stat().st_size
+    return {"files": files, "plugins": plugins}
+
+
+scenarios: dict[str, Faults] = {
+    "download": Faults(),
+    "segmented": Faults(),
+    "cached": Faults(),
+    "resume": Faults(failures=2),
+    "unavailable": Faults(unavailable=3),
+    "throttled": Faults(latency=0.05),
+    "plugin-manifests": Faults(latency=0.02),
+    "external-resources": Faults(latency=0.02),
+}
+
+
+@click.group()
+def cli():
+    pass
+
+
+@cli.command(help="Run the download benchmarks.")
+@click.option(
+    "--scenario",
+    "-s",
+    "selected",
+    type=click.Choice(list(scenarios)),
+    multiple=True,
+    help="Scenarios to run. Defaults to all of them.",
+)
+@click.option(
+    "--size", type=int, default=128, help="Size of the plain download in MiB."
+)
+@click.option("--plugins", type=int, default=8, help="Number of manifest plugins.")
+@click.option(
+    "--rate", type=int, default=32, help="Bandwidth of the throttled scenario in MiB/s."
+)
+@click.option("--repeat", "-r", type=int, default=1, help="Runs per scenario.")
+@click.option(
+    "--output",
+    "-o",
+    type=click.Path(dir_okay=False, path_type=Path),
+    help="Write the results to a JSON file.",
+)
+def run(
+    selected: tuple[str],
+    size: int,
+    plugins: int,
+    rate: int,
+    repeat: int,
+    output: Path | None,
+):
+    results = []
+    with tempfile.TemporaryDirectory(prefix="mo2-lint-bench-srv-") as root:
+        click.echo("Generating synthetic files...")
+        fixture = build_fixture(Path(root), size, plugins)
+        for name in selected or scenarios:
+            runs = []
+            for _ in range(repeat):
+                faults = Faults(**vars(scenarios[name]))
+                if name == "resume":
+                    faults.fail_after = size * mib // 4
+                if name == "throttled":
+                    faults.rate = rate * mib
+                server = Server(Path(root), faults).start()
+                try:
+                    runs.append(
+                        harness.run(Path(__file__), name, fixture | {"url": server.url})
+                    )
+                finally:
+                    server.shutdown()
+                    server.server_close()
+            results.append(harness.summarize(runs))
+            click.echo(f"  {name}: {results[-1].wall:.2f}s")
+    harness.report(results, output)
+    if not all(r.ok for r in results):
+        raise SystemExit(1)
+
+
+@cli.command(hidden=True)
+@click.argument("scenario")
+@click.argument("fixture", type=click.Path(exists=True, path_type=Path))
+def child(scenario: str, fixture: Path):
+    harness.quiet()
+    fx = json.loads(fixture.read_text())
+    settings(fx)
+    measured, prepare = globals()[f"scenario_{scenario.replace('-', '_')}"](fx)
+    harness.measure(scenario, measured, prepare)
+
+
+def settings(fx: dict):
+    """
+    Configures the installer inside a scenario process. Retries back off
+    briefly, so the scenarios measure the download engine rather than sleeps.
+    """
+
+    from util import lang  # noqa: F401 - imported first to resolve an import cycle
+    from util import variables as var
+
+    var.settings = var.InstallerSettings(
+        download=var.DownloadSettings(retry=var.RetrySettings(backoff=0.05))
+    )
+
+
+def plain_download(fx: dict, segments: int | None = None):
+    from util.cache.store import cache_dir
+    from util.download import download
+
+    blob = fx["files"]["blob.bin"]
+
+    def measured() -> int:
+        if not download(
+            fx["url"] + "blob.bin",
+            cache_dir / "downloads",
+            checksum=blob["sha256"],
+            segments=segments,
+        ):
+            raise RuntimeError("download failed")
+        return blob["size"]
+
+    return measured
+
+
+def scenario_download(fx: dict):
+    return plain_download(fx), None
+
+
+def scenario_segmented(fx: dict):
+    return plain_download(fx, segments=4), None
+
+
+def scenario_cached(fx: dict):
+    measured = plain_download(fx)
+    return measured, measured
+
+
+def scenario_resume(fx: dict):
+    return plain_download(fx), None
+
+
+def scenario_unavailable(fx: dict):
+    return plain_download(fx), None
+
+
+def scenario_throttled(fx: dict):
+    return plain_download(fx), None
+
+
+def configure_plugins(fx: dict):
+    from util import variables as var
+
+    var.plugin_info = {
+        f"plugin{i}": var.Plugin(manifest=f"{fx['url']}manifests/plugin{i}.json")
+        for i in range(fx["plugins"])
+    }
+
+
+def check_plugins(fx: dict):
+    installed = Path.home() / "instance" / "plugins"
+    missing = [
+        f"plugin{i}"
+        for i in range(fx["plugins"])
+        if not (installed / f"plugin{i}" / "__init__.py").exists()
+    ]
+    if missing:
+        raise RuntimeError(f"plugins not installed: {', '.join(missing)}")
+
+
+def instance() -> Path:
+    from util import state_file as state
+    from util import variables as var
+
+    directory = Path.home() / "instance"
+    directory.mkdir(parents=True, exist_ok=True)
+    var.set_parameters({"game": "bench", "directory": directory, "plugins": []})
+    state.load_state_file()
+    state.current_instance = state.InstanceData(
+        index=1,
+        game="bench",
+        nexus_slug="bench",
+        instance_path=directory,
+        launcher="steam",
+        launcher_ids=var.LauncherIDs(steam=1),
+        game_path=directory.parent / "game",
+        game_executable="bench.exe",
+        launch_option_index=1,
+    )
+    return directory
+
+
+def scenario_plugin_manifests(fx: dict):
+    from step.external_resources import download_plugin
+    from util import variables as var
+    from util.scheduler import Scheduler
+
+    configure_plugins(fx)
+    instance()
+
+    def measured() -> int:
+        with Scheduler() as scheduler:
+            for plugin in var.plugin_info:
+                scheduler.submit(plugin, download_plugin, plugin)
+            scheduler.wait()
+        check_plugins(fx)
+        return sum(
+            info["size"]
+            for path, info in fx["files"].items()
+            if path.startswith("plugins/")
+        )
+
+    return measured, None
+
+
+def scenario_external_resources(fx: dict):
+    from step import external_resources as er
+    from util import variables as var
+
+    files = fx["files"]
+    url = fx["url"]
+    var.resource_info = var.ResourceInfo(
+        mod_organizer=var.Resource.from_dict(
+            {
+                "download_url": url + "mo2.zip",
+                "checksum": files["mo2.zip"]["sha256"],
+                "path_internal": "ModOrganizer.exe",
+                "checksum_internal": files["mo2.zip"]["exe"],
+            }
+        ),
+        winetricks=var.Resource.from_dict({"download_url": url + "winetricks"}),
+        java=var.Resource.from_dict(
+            {
+                "download_url": url + "java.zip",
+                "checksum": files["java.zip"]["sha256"],
+                "path_internal": "jdk-jre/bin/java.exe",
+                "checksum_internal": files["java.zip"]["exe"],
+                "file_whitelist": {"subdirectory": "jdk-jre"},
+            }
+        ),
+    )
+    configure_plugins(fx)
+    var.games_info = {
+        "bench": var.GameInfo(
+            display_name="Benchmark",
+            nexus_slug="bench",
+            launcher_ids=var.LauncherIDs(steam=1),
+            workarounds=[{"needs_java": True}],
+            plugins=tuple(var.plugin_info),
+        )
+    }
+    var.game_info = var.games_info["bench"]
+    instance()
+
+    def measured() -> int:
+        er.download()
+        if not (Path.home() / "instance" / "ModOrganizer.exe").exists():
+            raise RuntimeError("Mod Organizer 2 was not installed")
+        check_plugins(fx)
+        return sum(info["size"] for info in files.values()) - files["blob.bin"]["size"]
+
+    return measured, None
+
+
+if __name__ == "__main__":
+    cli()
@@ -0,0 +1,253 @@
+#!/usr/bin/env python3
+"""
+Extraction benchmarks, comparing the archive backends of util.archive.
+
+Synthetic archives shaped like the Mod Organizer 2 and Java downloads are
+written as zip and, if 7-Zip is installed, as 7z. Real archives, e.g. the
+cached Mod Organizer 2 and Java downloads, can be passed with --file
+instead. Every available backend extracts every archive it can read in a
+fresh interpreter, and reports its wall time, throughput and peak RSS:
+
+    python benchmark/extract.py run
+    python benchmark/extract.py run --archive mo2.7z --backend 7z --repeat 3
+    python benchmark/extract.py run -f ~/.cache/mo2-lint/downloads/<archive>.7z
+"""
+
+import json
+import os
+import shutil
+import subprocess
+import tempfile
+import zipfile
+from pathlib import Path
+
+import click
+import harness
+from server import write_blob, write_zip
+
+mib = 1024 * 1024
+
+layouts: dict[str, dict[str, int]] = {
+    "mo2": {"ModOrganizer.exe": 8 * mib, "uibase.dll": 4 * mib}
+    | {f"dlls/lib{i}.dll": mib for i in range(24)}
+    | {f"plugins/plugin{i}.dll": 256 * 1024 for i in range(32)},
+    "java": {"jdk-jre/bin/java.exe": 2 * mib}
+    | {f"jdk-jre/lib/module{i}.jar": 2 * mib for i in range(12)},
+}
+
+# backends able to read each format; patool reads all of them through
+# external tools, and 7-Zip reads most other formats, such as rar
+readers = {
+    "zip": ("zipfile", "7z", "patool"),
+    "7z": ("7z", "patool"),
+    "other": ("7z", "patool"),
+}
+
+
+def seven_zip() -> str | None:
+    return next(
+        (path for name in ("7zz", "7z", "7za") if (path := shutil.which(name))), None
+    )
+
+
+def available() -> set[str]:
+    """
+    Returns the backends that can run here, matching util.archive.available_backends.
+    """
+
+    found = {"zipfile", "patool"}
+    if seven_zip():
+        found.add("7z")
+    return found
+
+
+def write_7z(path: Path, members: dict[str, int], seed: int) -> bool:
+    """
+    Writes a 7z archive with LZMA2 compression, with 7-Zip.
+
+    Returns
+    -------
+    bool
+        Whether the archive was written; False if 7-Zip isn't installed.
+    """
+
+    with tempfile.TemporaryDirectory(dir=path.parent) as staging:
+        for index, (name, size) in enumerate(members.items()):
+            write_blob(Path(staging) / name, size, seed * 1000 + index)
+        if seven_zip():
+            subprocess.run(
+                [seven_zip(), "a", "-t7z", "-m0=lzma2", "-mx=3", "-mmt=on", "-bd"]
+                + [str(path.resolve()), "."],
+                cwd=staging,
+                stdout=subprocess.DEVNULL,
+                check=True,
+            )
+        else:
+            return False
+    return True
+
+
+def build_fixture(root: Path) -> dict:
+    """
+    Writes the synthetic archives.
+
+    Returns
+    -------
+    dict
+        Path, format, member count and uncompressed size of each archive,
+        keyed by its file name.
+    """
+
+    archives = {}
+    for seed, (name, members) in enumerate(layouts.items(), start=1):
+        write_zip(root / f"{name}.zip", members, seed=seed)
+        written = {"zip": root / f"{name}.zip"}
+        if write_7z(root / f"{name}.7z", members, seed):
+            written["7z"] = root / f"{name}.7z"
+        for kind, path in written.items():
+            archives[path.name] = {
+                "path": str(path),
+                "format": kind,
+                "members": len(members),
+                "size": sum(members.values()),
+            }
+    return archives
+
+
+def describe(path: Path) -> dict:
+    """
+    Describes a real archive by its signature, like util.archive.archive_format.
+
+    Returns
+    -------
+    dict
+        Path, format, member count and uncompressed size of the archive. The
+        member count and size are only known upfront for zip archives; for
+        other formats they are None, and the size is taken from the
+        extracted files.
+    """
+
+    info = {"path": str(path), "format": "other", "members": None, "size": None}
+    if zipfile.is_zipfile(path):
+        with zipfile.ZipFile(path) as archive:
+            files = [member for member in archive.infolist() if not member.is_dir()]
+        info |= {
+            "format": "zip",
+            "members": len(files),
+            "size": sum(member.file_size for member in files),
+        }
+    else:
+        with path.open("rb") as file:
+            if file.read(6) == b"7z\xbc\xaf\x27\x1c":
+                info["format"] = "7z"
+    return info
+
+
+@click.group()
+def cli():
+    pass
+
+
+@cli.command(help="Run the extraction benchmarks.")
+@click.option(
+    "--archive",
+    "-a",
+    "selected_archives",
+    multiple=True,
+    help="Archives to extract, e.g. mo2.zip. Defaults to all of them.",
+)
+@click.option(
+    "--file",
+    "-f",
+    "files",
+    type=click.Path(exists=True, dir_okay=False, path_type=Path),
+    multiple=True,
+    help="Real archives to extract instead of the synthetic ones.",
+)
+@click.option(
+    "--backend",
+    "-b",
+    "selected_backends",
+    type=click.Choice(["zipfile", "7z", "patool"]),
+    multiple=True,
+    help="Backends to compare. Defaults to all available ones.",
+)
+@click.option("--repeat", "-r", type=int, default=1, help="Runs per scenario.")
+@click.option(
+    "--output",
+    "-o",
+    type=click.Path(dir_okay=False, path_type=Path),
+    help="Write the results to a JSON file.",
+)
+def run(
+    selected_archives: tuple[str],
+    files: tuple[Path],
+    selected_backends: tuple[str],
+    repeat: int,
+    output: Path | None,
+):
+    backends = available()
+    for backend in set(selected_backends) - backends:
+        click.echo(f"Skipping {backend}: not installed.")
+    results = []
+    with tempfile.TemporaryDirectory(prefix="mo2-lint-bench-archives-") as root:
+        if files:
+            # keep symlinks, so cached archives keep their name rather than
+            # that of their store object
+            archives = {path.name: describe(path.absolute()) for path in files}
+        else:
+            click.echo("Generating synthetic archives...")
+            archives = build_fixture(Path(root))
+            if "7z" not in {info["format"] for info in archives.values()}:
+                click.echo("Skipping 7z archives: 7-Zip is not installed.")
+        for name, info in archives.items():
+            if selected_archives and name not in selected_archives:
+                continue
+            for backend in readers[info["format"]]:
+                if backend not in backends or (
+                    selected_backends and backend not in selected_backends
+                ):
+                    continue
+                scenario = f"{name}-{backend}"
+                runs = [
+                    harness.run(Path(__file__), scenario, info | {"backend": backend})
+                    for _ in range(repeat)
+                ]
+                results.append(harness.summarize(runs))
+                click.echo(f"  {scenario}: {results[-1].wall:.2f}s")
+    harness.report(results, output)
+    if not all(r.ok for r in results):
+        raise SystemExit(1)
+
+
+@cli.command(hidden=True)
+@click.argument("scenario")
+@click.argument("fixture", type=click.Path(exists=True, path_type=Path))
+def child(scenario: str, fixture: Path):
+    harness.quiet()
+    fx = json.loads(fixture.read_text())
+
+    import util.lang  # noqa: F401 - imported first to resolve an import cycle
+    from util import archive
+
+    destination = Path.home() / "extracted"
+
+    def measured() -> int:
+        stamp = archive.extract_tree(
+            Path(fx["path"]), destination, "benchmark", fx["backend"]
+        )
+        if fx["members"] is not None and stamp.members != fx["members"]:
+            raise RuntimeError(
+                f"extracted {stamp.members} of {fx['members']} files with {fx['backend']}"
+            )
+        return fx["size"] or sum(
+            (Path(folder) / name).stat().st_size
+            for folder, _, names in os.walk(destination)
+            for name in names
+        )
+
+    harness.measure(scenario, measured)
+
+
+if __name__ == "__main__":
+    cli()
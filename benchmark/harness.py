@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+Runs benchmark scenarios in fresh subprocesses and reports their results.
+"""
+
+import json
+import os
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from dataclasses import asdict, dataclass
+from pathlib import Path
+
+import click
+
+src = Path(__file__).resolve().parent.parent / "src"
+marker = "BENCHMARK-RESULT "
+
+
+@dataclass
+class Result:
+    """
+    Stores the measurements of one scenario run.
+
+    Parameters
+    ----------
+    scenario : str
+        Name of the scenario.
+    ok : bool
+        Whether the scenario completed without errors.
+    wall : float
+        Wall time of the measured part, in seconds.
+    size : int
+        Bytes transferred or processed by the measured part.
+    peak_rss : int
+        Peak resident set size of the scenario's process, in bytes.
+    error : str, optional
+        The error the scenario failed with.
+    """
+
+    scenario: str
+    ok: bool
+    wall: float
+    size: int
+    peak_rss: int
+    error: str | None = None
+
+    @property
+    def throughput(self) -> float:
+        return self.size / self.wall if self.wall else 0.0
+
+
+def run(script: Path, scenario: str, fixture: dict, timeout: float = 900) -> Result:
+    """
+    Runs a scenario in a new interpreter with an empty home folder, so every
+    run starts with a cold cache and its peak RSS is measured on its own.
+
+    The script is invoked as `<script> child <scenario> <fixture file>` and
+    must call measure() to report its result.
+    """
+
+    with tempfile.TemporaryDirectory(prefix="mo2-lint-bench-") as home:
+        fixture_file = Path(home) / "fixture.json"
+        fixture_file.write_text(json.dumps(fixture))
+        env = os.environ | {
+            "HOME": home,
+            "PYTHONPATH": os.pathsep.join([str(src / "mo2-lint"), str(src)]),
+        }
+        try:
+            proc = subprocess.run(
+                [sys.executable, str(script), "child", scenario, str(fixture_file)],
+                env=env,
+                capture_output=True,
+                text=True,
+                timeout=timeout,
+                check=False,
+            )
+        except subprocess.TimeoutExpired:
+            return Result(scenario, False, timeout, 0, 0, "timed out")
+    for line in reversed(proc.stdout.splitlines()):
+        if line.startswith(marker):
+            return Result(**json.loads(line.removeprefix(marker)))
+    error = (proc.stderr.strip().splitlines() or [f"exit code {proc.returncode}"])[-1]
+    return Result(scenario, False, 0.0, 0, 0, error)
+
+
+def measure(scenario: str, fn, prepare=None):
+    """
+    Measures fn inside a scenario subprocess and prints the result for run().
+
+    Parameters
+    ----------
+    scenario : str
+        Name of the scenario.
+    fn : callable
+        The measured work. Returns the number of bytes it transferred or processed.
+    prepare : callable, optional
+        Unmeasured setup, e.g. to warm the cache.
+    """
+
+    if prepare:
+        prepare()
+    error = None
+    size = 0
+    start = time.perf_counter()
+    try:
+        size = fn() or 0
+    except BaseException as e:
+        error = f"{type(e).__name__}: {e}"
+    wall = time.perf_counter() - start
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+    result = Result(scenario, error is None, wall, size, peak, error)
+    print(marker + json.dumps(asdict(result)), flush=True)
+
+
+def quiet(level: str = "WARNING"):
+    """
+    Sends installer logs of the given level and above to stderr.
+    """
+
+    from loguru import logger
+
+    logger.remove()
+    logger.add(sys.stderr, level=level)
+
+
+def summarize(runs: list[Result]) -> Result:
+    """
+    Combines repeated runs of a scenario into their median.
+    """
+
+    ok = [r for r in runs if r.ok]
+    if not ok:
+        return runs[-1]
+    median = sorted(ok, key=lambda r: r.wall)[len(ok) // 2]
+    return Result(
+        median.scenario,
+        len(ok) == len(runs),
+        statistics.median(r.wall for r in ok),
+        median.size,
+        max(r.peak_rss for r in ok),
+        next((r.error for r in runs if not r.ok), None),
+    )
+
+
+def report(results: list[Result], output: Path | None = None):
+    """
+    Prints a table of results, and optionally writes them as JSON.
+    """
+
+    mib = 1024 * 1024
+    click.echo(
+        f"{'Scenario':<24} {'Wall (s)':>9} {'MiB/s':>9} {'Peak RSS (MiB)':>15}  Status"
+    )
+    for r in results:
+        status = "ok" if r.ok else f"FAILED: {r.error}"
+        click.echo(
+            f"{r.scenario:<24} {r.wall:>9.2f} {r.throughput / mib:>9.1f} {r.peak_rss / mib:>15.1f}  {status}"
+        )
+    if output:
+        output.write_text(json.dumps([asdict(r) for r in results], indent=2))
+        click.echo(f"Results written to {output}")
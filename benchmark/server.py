@@ -0,0 +1,268 @@
+#!/usr/bin/env python3
+"""
+Local HTTP stand-in for the download benchmarks.
+
+Serves synthetic files from a folder with Range, HEAD and ETag support, and
+can add latency, throttle each connection, drop connections part-way through
+a transfer, or answer with 503 and a Retry-After header.
+"""
+
+import contextlib
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+import zipfile
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import unquote, urlsplit
+
+import click
+
+chunk_size = 64 * 1024
+
+
+@dataclass
+class Faults:
+    """
+    Stores the network conditions the server simulates.
+
+    Parameters
+    ----------
+    latency : float
+        Seconds to wait before answering each request.
+    rate : int
+        Maximum bytes per second sent on each connection. 0 means unlimited.
+    fail_after : int
+        Bytes after which a faulty transfer drops its connection.
+    failures : int
+        Number of GET requests that drop their connection after fail_after bytes.
+    unavailable : int
+        Number of requests answered with 503 and Retry-After: 0.
+    """
+
+    latency: float = 0.0
+    rate: int = 0
+    fail_after: int = 0
+    failures: int = 0
+    unavailable: int = 0
+
+
+class Server(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, root: Path, faults: Faults | None = None):
+        super().__init__(("127.0.0.1", 0), Handler)
+        self.root = root
+        self.faults = faults or Faults()
+        self.lock = threading.Lock()
+        self.requests = 0
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}/"
+
+    def take(self, name: str) -> bool:
+        """
+        Uses up one of the remaining injected faults, if any are left.
+        """
+
+        with self.lock:
+            left = getattr(self.faults, name)
+            if left > 0:
+                setattr(self.faults, name, left - 1)
+                return True
+            return False
+
+    def start(self) -> "Server":
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server: Server
+
+    def log_message(self, *args):
+        pass
+
+    def do_HEAD(self):
+        self.serve(body=False)
+
+    def do_GET(self):
+        self.serve(body=True)
+
+    def empty(self, status: int, headers: dict | None = None):
+        self.send_response(status)
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def serve(self, body: bool):
+        server = self.server
+        with server.lock:
+            server.requests += 1
+        if server.faults.latency:
+            time.sleep(server.faults.latency)
+        if server.take("unavailable"):
+            self.empty(503, {"Retry-After": "0"})
+            return
+
+        path = server.root / unquote(urlsplit(self.path).path).lstrip("/")
+        if not path.is_file():
+            self.empty(404)
+            return
+        if path.suffix == ".json":
+            # manifests refer to the server, whose port is only known now
+            data = path.read_bytes().replace(b"{url}", server.url.encode())
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            if body:
+                self.wfile.write(data)
+            return
+        st = path.stat()
+        size = st.st_size
+        etag = f'"{st.st_mtime_ns:x}-{size:x}"'
+        start, end, status = 0, size - 1, 200
+        match = re.fullmatch(r"bytes=(\d+)-(\d*)", self.headers.get("Range", ""))
+        validator = self.headers.get("If-Range")
+        if match and (not validator or validator == etag):
+            start = int(match.group(1))
+            end = min(int(match.group(2)), size - 1) if match.group(2) else size - 1
+            if start >= size:
+                self.empty(416, {"Content-Range": f"bytes */{size}"})
+                return
+            status = 206
+
+        self.send_response(status)
+        self.send_header("Content-Length", str(end - start + 1))
+        self.send_header("Accept-Ranges", "bytes")
+        self.send_header("ETag", etag)
+        if status == 206:
+            self.send_header("Content-Range", f"bytes {start}-{end}/{size}")
+        self.end_headers()
+        if body:
+            self.send_body(path, start, end - start + 1)
+
+    def send_body(self, path: Path, offset: int, length: int):
+        faults = self.server.faults
+        drop_at = faults.fail_after if self.server.take("failures") else None
+        began = time.monotonic()
+        sent = 0
+        with open(path, "rb") as f:
+            f.seek(offset)
+            while sent < length:
+                data = f.read(min(chunk_size, length - sent))
+                if drop_at is not None and sent + len(data) > drop_at:
+                    self.wfile.write(data[: max(0, drop_at - sent)])
+                    self.wfile.flush()
+                    self.close_connection = True
+                    self.connection.shutdown(2)
+                    return
+                self.wfile.write(data)
+                sent += len(data)
+                if faults.rate:
+                    ahead = sent / faults.rate - (time.monotonic() - began)
+                    if ahead > 0:
+                        time.sleep(ahead)
+
+
+def sha256(path: Path) -> str:
+    with open(path, "rb") as f:
+        return hashlib.file_digest(f, "sha256").hexdigest()
+
+
+def write_blob(path: Path, size: int, seed: int = 0) -> str:
+    """
+    Writes a file of pseudo-random bytes and returns its SHA-256 checksum.
+
+    The data is derived from seed, so repeated runs produce the same files.
+    Half of every block is random and half repeats, so archives of it
+    compress to roughly half their size, like typical binaries.
+    """
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    rng = random.Random(seed)
+    block = 1024 * 1024
+    digest = hashlib.sha256()
+    with open(path, "wb") as f:
+        left = size
+        while left:
+            length = min(block, left)
+            noise = rng.randbytes(length // 2)
+            data = (noise + noise[:64] * (length // 128 + 1))[:length]
+            f.write(data)
+            digest.update(data)
+            left -= length
+    return digest.hexdigest()
+
+
+def write_zip(
+    path: Path, members: dict[str, int], seed: int = 0, compress: bool = True
+) -> tuple[str, dict[str, str]]:
+    """
+    Writes a zip archive of pseudo-random members.
+
+    Parameters
+    ----------
+    path : Path
+        The archive to write.
+    members : dict[str, int]
+        Member paths and their sizes in bytes.
+    seed : int, optional
+        Seed for the member contents.
+    compress : bool, optional
+        Whether to deflate the members.
+
+    Returns
+    -------
+    tuple[str, dict[str, str]]
+        The SHA-256 checksum of the archive, and of each member.
+    """
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    scratch = path.with_suffix(".member")
+    checksums = {}
+    method = zipfile.ZIP_DEFLATED if compress else zipfile.ZIP_STORED
+    with zipfile.ZipFile(path, "w", method, compresslevel=1) as archive:
+        for index, (name, size) in enumerate(members.items()):
+            checksums[name] = write_blob(scratch, size, seed * 1000 + index)
+            archive.write(scratch, name)
+    scratch.unlink()
+    return sha256(path), checksums
+
+
+def write_manifest(path: Path, url: str, plugin_path: str):
+    """
+    Writes a plugin manifest in the format of the MO2 plugin repositories.
+    A `{url}` placeholder in the download URL is replaced by the server's URL.
+    """
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(
+        json.dumps(
+            {"Versions": [{"DownloadUrl": url, "PluginPath": [plugin_path]}]},
+            indent=2,
+        )
+    )
+
+
+@click.command(help="Serve a folder with simulated network conditions.")
+@click.argument("root", type=click.Path(exists=True, file_okay=False, path_type=Path))
+@click.option("--latency", type=float, default=0.0, help="Seconds per request.")
+@click.option("--rate", type=int, default=0, help="Bytes per second per connection.")
+def main(root: Path, latency: float, rate: int):
+    server = Server(root, Faults(latency=latency, rate=rate))
+    click.echo(f"Serving {root} at {server.url}")
+    with contextlib.suppress(KeyboardInterrupt):
+        server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
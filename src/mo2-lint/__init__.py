@@ -1,20 +1,21 @@
 #!/usr/bin/env python3
 
 import re
-import ssl
 import tempfile
 from getpass import getuser
 from pathlib import Path
 from shutil import copy2
 
-import certifi
 import click
 import yaml
+from command import cache as _cache
 from command.install import install as _install
 from command.list import list as _list
 from command.pin import pin as _pin
+from command.prefetch import prefetch as _prefetch
 from command.uninstall import uninstall as _uninstall
 from command.update import update as _update
+from command.verify import verify as _verify
 from loguru import logger
 from packaging.version import Version as version
 from pydantic_core import from_json
@@ -25,19 +26,16 @@ from util.internal_file import internal_file
 
 from shared.logger import add_loggers, remove_loggers
 
-ssl_context = ssl.create_default_context(cafile=certifi.where())
-
 
 def check_update():
-    import requests
+    from util import http
 
     logger.info("Checking for updates.")
     try:
         logger.trace("Fetching latest release info from GitHub API.")
         response = from_json(
-            requests.get(
-                "https://api.github.com/repos/Furglitch/modorganizer2-linux-installer/releases/latest",
-                verify=certifi.where(),
+            http.get(
+                "https://api.github.com/repos/Furglitch/modorganizer2-linux-installer/releases/latest"
             ).text
         )
         latest = version(response["tag_name"].lstrip("v"))
@@ -117,13 +115,12 @@ def pull_config():
         remote_raw = f"https://raw.githubusercontent.com/Furglitch/modorganizer2-linux-installer/refs/heads/main/configs/{config}"
 
         try:
-            from urllib.request import Request, urlopen
-
-            from requests import get
+            from util import http
 
             # Check remote schema version
             logger.debug(f"Fetching remote config from GitHub: {remote_raw}")
-            response = get(remote_raw, verify=certifi.where())
+            response = http.get(remote_raw)
+            response.raise_for_status()
             remote_yml = yaml.load(response.text, Loader=yaml.SafeLoader)
             remote_schema_version = version(str(remote_yml.get("schema", 0)))
             local_version = version(var.version)
@@ -140,12 +137,8 @@ def pull_config():
                 )
             else:
                 config_path.parent.mkdir(parents=True, exist_ok=True)
-                req = Request(remote_raw)
-                with (
-                    urlopen(req, context=ssl_context) as response,
-                    open(config_path, "wb") as out_file,
-                ):
-                    out_file.write(response.read())
+                with open(config_path, "wb") as out_file:
+                    out_file.write(response.content)
         except Exception:
             logger.exception(f"Failed to download config file {config}")
 
@@ -606,5 +599,155 @@ def update(
     )
 
 
+@cli.command(help=lang.help_prefetch.format(list=game_list))
+@click_version
+@click_help
+@click_log_level
+@click_unattended
+@click_opt_game_info
+@click.option(
+    "--all",
+    "all_games",
+    is_flag=True,
+    default=False,
+    help="Prefetch resources for every supported game.",
+)
+@click.argument("games", nargs=-1, required=False)
+def prefetch(
+    games: tuple[str],
+    all_games: bool,
+    game_info_path: Path | None,
+    log_level,
+    unattended: bool,
+):
+    start(log_level=log_level, unattended=unattended)
+    load_games_info(game_info_path)
+    logger.debug(
+        f"Running prefetch command with games={games}, all={all_games}, game_info_path={game_info_path}"
+    )
+    if all_games:
+        games = tuple(var.games_info.keys())
+    if not games:
+        logger.critical("No games given. Provide one or more games, or use --all.")
+        raise SystemExit(1)
+    for game in games:
+        if game not in var.games_info:
+            available_games = ", ".join(var.games_info.keys())
+            logger.critical(
+                f"Game '{game}' not supported. Available games: {available_games}"
+            )
+            raise SystemExit(1)
+    _prefetch(list(games))
+
+
+@cli.command(help=lang.help_verify)
+@click_version
+@click_help
+@click_log_level
+@click_unattended
+@click_opt_game_info
+@click_opt_directory
+@click_opt_game
+@click.option(
+    "--workers",
+    "-w",
+    type=click.IntRange(min=1),
+    default=None,
+    help="Number of files to hash at once. Defaults to the number of CPUs.",
+)
+def verify(
+    game: str | None,
+    directory: Path | None,
+    game_info_path: Path | None,
+    workers: int | None,
+    log_level,
+    unattended: bool,
+):
+    game, directory = start(game, directory, game_info_path, log_level, unattended)
+    load_games_info(game_info_path)
+    logger.debug(
+        f"Running verify command with game={game}, directory={directory}, workers={workers}"
+    )
+    _verify(game, directory, workers)
+
+
+@cli.group(name="cache", help=lang.help_cache)
+@click_help
+def cache():
+    pass
+
+
+@cache.command(name="stats", help=lang.help_cache_stats)
+@click_help
+@click_log_level
+def cache_stats(log_level):
+    start(log_level=log_level)
+    logger.debug("Running cache stats command")
+    _cache.stats()
+
+
+@cache.command(name="verify", help=lang.help_cache_verify)
+@click_help
+@click_log_level
+@click_opt_game_info
+@click.option(
+    "--workers",
+    "-w",
+    type=click.IntRange(min=1),
+    default=None,
+    help="Number of files to hash at once. Defaults to the number of CPUs.",
+)
+def cache_verify(game_info_path: Path | None, workers: int | None, log_level):
+    start(log_level=log_level)
+    load_games_info(game_info_path)
+    logger.debug(f"Running cache verify command with workers={workers}")
+    _cache.verify(workers)
+
+
+@cache.command(name="gc", help=lang.help_cache_gc)
+@click_help
+@click_log_level
+@click_opt_game_info
+@click.option(
+    "--older-than",
+    type=click.FloatRange(min=0),
+    default=0,
+    help="Only remove unreferenced items unused for at least this many days.",
+)
+@click.option(
+    "--max-size",
+    type=click.IntRange(min=1),
+    default=None,
+    help="Afterward, evict least recently used archives until the store fits within this many MiB.",
+)
+@click.option(
+    "--dry-run",
+    "-n",
+    is_flag=True,
+    default=False,
+    help="Only show what would be removed.",
+)
+@click.option(
+    "--shared",
+    is_flag=True,
+    default=False,
+    help="Also remove unreferenced archives from the shared store, even if other users' instances use them.",
+)
+def cache_gc(
+    game_info_path: Path | None,
+    older_than: float,
+    max_size: int | None,
+    dry_run: bool,
+    shared: bool,
+    log_level,
+):
+    start(log_level=log_level)
+    load_games_info(game_info_path)
+    logger.debug(
+        f"Running cache gc command with older_than={older_than}, max_size={max_size}, dry_run={dry_run}, shared={shared}"
+    )
+    _cache.gc(older_than, max_size, dry_run, shared)
+
+
 if __name__ == "__main__":
     cli()
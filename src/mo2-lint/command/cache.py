@@ -0,0 +1,471 @@
+#!/usr/bin/env python3
+
+import os
+import shutil
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from loguru import logger
+from util import variables as var
+from util.cache import store
+from util.checksum import get_checksums
+from util.metrics import format_size
+
+categories = ("downloads", "extracted", "plugins", "themes", "workarounds")
+
+
+@dataclass
+class References:
+    """
+    Stores everything the current configs and instances may still need.
+
+    Parameters
+    -----------
+    digests : set[str]
+        SHA-256 checksums of referenced archives.
+    sources : set[str]
+        URLs and Nexus source identifiers of referenced archives.
+    plugins : set[str]
+        Names of referenced plugins. Their download folders are kept, since
+        manifest-based plugins only resolve their URL at install time.
+    themes : set[str]
+        Slugs of referenced themes.
+    """
+
+    digests: set[str] = field(default_factory=set)
+    sources: set[str] = field(default_factory=set)
+    plugins: set[str] = field(default_factory=set)
+    themes: set[str] = field(default_factory=set)
+
+    def add(self, url: str | None = None, checksum: str | None = None):
+        if url:
+            self.sources.add(url)
+        if checksum:
+            self.digests.add(checksum)
+
+    def file_names(self) -> set[str]:
+        """
+        Returns the file names the referenced URLs are downloaded to.
+        """
+
+        return {source.split("/")[-1] for source in self.sources}
+
+
+def category(path: Path) -> str:
+    """
+    Returns the stats category of a path below the download or extract directory.
+    """
+
+    parts = path.parts
+    if parts and parts[0] in ("plugins", "themes", "workarounds"):
+        return parts[0]
+    return "downloads"
+
+
+def tree_size(path: Path) -> int:
+    """
+    Returns the total size of the files below path, without following symlinks.
+    """
+
+    if path.is_symlink() or path.is_file():
+        return path.lstat().st_size
+    total = 0
+    for root, _dirs, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.lstat(os.path.join(root, name)).st_size
+            except OSError:
+                continue
+    return total
+
+
+def download_links() -> list[Path]:
+    """
+    Lists the downloaded archives (symlinks into the store, or plain files
+    from before the store existed), relative to the download directory.
+    """
+
+    from step.external_resources import download_dir
+
+    if not download_dir.exists():
+        return []
+    links = []
+    for root, dirs, files in os.walk(download_dir):
+        if Path(root) == download_dir and "extracted" in dirs:
+            dirs.remove("extracted")
+        for name in files:
+            if name.endswith((".part", ".part.json")):
+                continue
+            links.append((Path(root) / name).relative_to(download_dir))
+    return links
+
+
+def extracted_trees() -> list[Path]:
+    """
+    Lists the extracted archive folders, relative to the extract directory.
+    Hidden entries are skipped: they are extractions still in progress, see
+    util.archive.extract_tree.
+    """
+
+    from step.external_resources import extract_dir
+
+    def listed(folder: Path) -> list[Path]:
+        return [entry for entry in folder.iterdir() if not entry.name.startswith(".")]
+
+    if not extract_dir.exists():
+        return []
+    trees = []
+    for entry in listed(extract_dir):
+        if entry.name in ("plugins", "themes"):
+            # extracted/<plugins|themes>/<name>/<archive>
+            trees += [
+                tree.relative_to(extract_dir)
+                for parent in listed(entry)
+                if parent.is_dir()
+                for tree in listed(parent)
+            ]
+        elif entry.name in ("workarounds", "scriptextender"):
+            trees += [tree.relative_to(extract_dir) for tree in listed(entry)]
+        else:
+            trees.append(entry.relative_to(extract_dir))
+    return trees
+
+
+def extracted_for(link: Path) -> list[Path]:
+    """
+    Returns where a downloaded archive is extracted to, relative to the extract directory.
+    """
+
+    name = Path(link.name)
+    if link.parts[0] == "plugins":
+        return [link]
+    if link.parts[0] in ("themes", "workarounds"):
+        return [link.parent / name.stem]
+    # MO2 and Java are extracted by stem, script extenders by name
+    return [Path(name.stem), Path("scriptextender") / name]
+
+
+def link_digest(link: Path) -> str | None:
+    """
+    Returns the checksum of the store object a download links to.
+    """
+
+    from step.external_resources import download_dir
+
+    path = download_dir / link
+    if path.is_symlink() and path.readlink().parent.parent == store.objects_dir():
+        return path.readlink().name
+    return None
+
+
+def references() -> References:
+    """
+    Collects the archives referenced by the loaded config files and by the
+    instances in the state file.
+    """
+
+    from step.workarounds import instance_files
+    from util import state_file as state
+
+    refs = References()
+    info = var.resource_info
+    for resource in (info.mod_organizer, info.java, info.winetricks) if info else ():
+        if resource:
+            refs.add(resource.download_url, resource.checksum)
+            for mirror in resource.mirrors or ():
+                refs.add(mirror)
+
+    for name, plugin in (var.plugin_info or {}).items():
+        refs.plugins.add(name)
+        refs.add(plugin.direct, plugin.checksum)
+
+    for slug in var.theme_info or {}:
+        refs.themes.add(slug)
+        theme = var.resolve_theme(slug)
+        if theme and theme.nexus:
+            nexus = theme.nexus
+            refs.add(
+                f"nexus:{nexus.get('slug')}/{nexus.get('mod_id')}/{nexus.get('file_id')}"
+            )
+
+    for game in var.games_info or {}:
+        game_info = var.resolve_game_info(game)
+        for entry in game_info.script_extenders or []:
+            download = entry.download
+            if not download:
+                continue
+            refs.add(checksum=download.checksum)
+            direct = download.direct
+            if isinstance(direct, dict):
+                refs.add(direct.get("url"), direct.get("checksum"))
+            else:
+                refs.add(direct)
+            for mirror in download.mirrors or ():
+                refs.add(mirror)
+            if download.nexus:
+                nexus = download.nexus
+                refs.add(
+                    f"nexus:{game_info.nexus_slug}/{nexus.get('mod')}/{nexus.get('file')}",
+                    nexus.get("checksum"),
+                )
+        for file_info in instance_files(game_info):
+            refs.add(file_info.get("download_url"), file_info.get("checksum"))
+            refs.add(checksum=file_info.get("checksum_internal"))
+
+    for instance in state.state_file.instances if state.state_file else []:
+        refs.plugins.update(instance.plugins or ())
+    return refs
+
+
+def is_referenced(link: Path, refs: References, index: store.StoreIndex) -> bool:
+    """
+    Returns whether a downloaded archive is still referenced.
+    """
+
+    from step.external_resources import download_dir
+
+    if link.parts[0] == "plugins" and len(link.parts) > 1:
+        return link.parts[1] in refs.plugins
+    if link.parts[0] == "themes" and len(link.parts) > 1:
+        return link.parts[1] in refs.themes
+    digest = link_digest(link)
+    if digest is None:
+        # downloads from before the store are plain files, named after their URL
+        return not (download_dir / link).is_symlink() and link.name in refs.file_names()
+    if digest in refs.digests:
+        return True
+    item = index.objects.get(digest)
+    return bool(item and refs.sources.intersection(item.sources))
+
+
+def remove(path: Path, dry_run: bool) -> int:
+    """
+    Removes a file, symlink or folder and returns the number of bytes freed.
+    """
+
+    size = tree_size(path)
+    logger.info(
+        f"{'Would remove' if dry_run else 'Removing'} {path} ({format_size(size)})"
+    )
+    if not dry_run:
+        if path.is_dir() and not path.is_symlink():
+            shutil.rmtree(path)
+        else:
+            path.unlink(missing_ok=True)
+    return size
+
+
+def stats():
+    """
+    Logs the size of the cache, split by category.
+    """
+
+    from step.external_resources import download_dir, extract_dir
+
+    archives = dict.fromkeys(categories, 0)
+    extracted = dict.fromkeys(categories, 0)
+    index = store.load_index()
+    linked = set()
+    for link in download_links():
+        digest = link_digest(link)
+        if digest:
+            if digest in linked:
+                continue
+            linked.add(digest)
+            size = index.objects[digest].size if digest in index.objects else 0
+        else:
+            size = tree_size(download_dir / link)
+        archives[category(link)] += size
+    unlinked = sum(
+        item.size for digest, item in index.objects.items() if digest not in linked
+    )
+    archives["downloads"] += unlinked
+
+    for tree in extracted_trees():
+        name = "extracted" if category(tree) == "downloads" else category(tree)
+        extracted[name] += tree_size(extract_dir / tree)
+
+    cache = var.settings.cache if var.settings else var.CacheSettings()
+    logger.success(f"Download cache at {store.cache_dir}")
+    if store.shared_root():
+        logger.info(f"Archives are stored in the shared cache at {store.shared_root()}")
+    logger.info(f"  {'Category':<12} {'Archives':>12} {'Extracted':>12}")
+    for name in categories:
+        logger.info(
+            f"  {name:<12} {format_size(archives[name]):>12} {format_size(extracted[name]):>12}"
+        )
+    total = sum(archives.values()) + sum(extracted.values())
+    limit = f"{format_size(cache.max_size * 1024 * 1024)}" if cache.max_size else "none"
+    logger.info(
+        f"  {len(index.objects)} stored archives ({format_size(index.total_size())}, limit {limit}), {format_size(total)} in total"
+    )
+
+
+def verify(workers: int | None = None):
+    """
+    Re-hashes every stored archive, and every extracted file with a known
+    checksum, in parallel. Stored archives that are missing or don't match
+    their checksum are removed from the store so they are downloaded again.
+
+    Parameters
+    ----------
+    workers : int, optional
+        Number of files to hash at once. Defaults to the number of CPUs.
+    """
+
+    from step.external_resources import extract_dir
+
+    index = store.load_index()
+    checks: list[tuple[str, Path, str]] = [
+        (item.name or digest, store.object_path(digest), digest)
+        for digest, item in index.objects.items()
+    ]
+    known = {digest for _, _, digest in checks}
+    info = var.resource_info
+    for key in ("mod_organizer", "java", "winetricks"):
+        resource = getattr(info, key, None) if info else None
+        if not resource:
+            continue
+        if resource.checksum and resource.checksum not in known:
+            logger.info(f"{key} ({resource.version}) is not cached.")
+        stem = Path(resource.download_url.split("/")[-1]).stem
+        for name, expected in (resource.manifest or {}).items():
+            if (extract_dir / stem / name).exists():
+                checks.append(
+                    (f"{key} {name}", extract_dir / stem / name, expected.checksum)
+                )
+        if resource.path_internal and resource.checksum_internal:
+            internal = extract_dir / stem / resource.path_internal
+            if internal.exists():
+                checks.append(
+                    (
+                        f"{key} {resource.path_internal}",
+                        internal,
+                        resource.checksum_internal,
+                    )
+                )
+    for name, plugin in (var.plugin_info or {}).items():
+        if plugin.checksum and plugin.checksum not in known:
+            logger.debug(f"Plugin {name} is not cached.")
+
+    logger.info(f"Verifying {len(checks)} cached files.")
+    failed = 0
+    present = []
+    for name, path, expected in checks:
+        if path.is_file():
+            present.append((name, path, expected))
+            continue
+        # evicted, or removed by another user of a shared root
+        failed += 1
+        logger.error(f"{name} is missing: {path}")
+        if path.parent.parent == store.objects_dir():
+            store.discard(expected)
+    digests = get_checksums((path for _, path, _ in present), workers, memo=False)
+
+    for name, path, expected in present:
+        digest = digests[path]
+        if digest == expected:
+            logger.trace(f"{name}: OK")
+            continue
+        failed += 1
+        logger.error(f"{name} at {path} is corrupt: {digest} != {expected}")
+        if path.parent.parent == store.objects_dir():
+            store.discard(expected)
+    if failed:
+        logger.critical(
+            f"{failed} of {len(checks)} cached files failed verification. Missing and corrupt archives were removed from the store and will be downloaded again."
+        )
+        raise SystemExit(1)
+    logger.success(f"All {len(checks)} cached files are intact.")
+
+
+def gc(
+    older_than: float = 0,
+    max_size: int | None = None,
+    dry_run: bool = False,
+    shared: bool = False,
+):
+    """
+    Removes cached archives and extracted folders that are no longer referenced
+    by the config files or by any instance, as well as stale partial downloads.
+
+    With a `[cache] shared_root`, only this user's links and extracted folders
+    are collected by default. The shared store may hold archives that other
+    users' instances need, which this user's state file doesn't know about,
+    so they are left to least recently used eviction.
+
+    Parameters
+    ----------
+    older_than : float, optional
+        Only remove unreferenced items not used for at least this many days.
+    max_size : int, optional
+        Afterward, evict least recently used archives (referenced or not)
+        until the store fits within this many MiB.
+    dry_run : bool, optional
+        Only log what would be removed.
+    shared : bool, optional
+        Also remove unreferenced archives from the shared store.
+    """
+
+    from step.external_resources import download_dir, extract_dir, extract_flight
+
+    refs = references()
+    index = store.load_index()
+    cutoff = time.time() - older_than * 86400
+    freed = 0
+
+    kept_digests: set[str] = set()
+    kept_trees: set[Path] = set()
+    for link in download_links():
+        digest = link_digest(link)
+        path = download_dir / link
+        if is_referenced(link, refs, index):
+            if digest:
+                kept_digests.add(digest)
+            kept_trees.update(extracted_for(link))
+            continue
+        used = index.objects[digest].last_access if digest in index.objects else None
+        if (used or path.lstat().st_mtime) > cutoff:
+            if digest:
+                kept_digests.add(digest)
+            kept_trees.update(extracted_for(link))
+            continue
+        freed += remove(path, dry_run)
+
+    collect_store = shared or not store.shared_root()
+    if not collect_store:
+        logger.debug(
+            "Leaving unreferenced archives in the shared store to least recently used eviction."
+        )
+    for digest, item in list(index.objects.items()) if collect_store else []:
+        if digest in kept_digests or digest in refs.digests:
+            continue
+        if refs.sources.intersection(item.sources) or item.last_access > cutoff:
+            continue
+        freed += remove(store.object_path(digest), dry_run)
+        if not dry_run:
+            store.discard(digest)
+
+    # a running install may still be copying from a tree it just extracted
+    # or reused, which updates the tree's mtime
+    tree_cutoff = min(cutoff, time.time() - 3600)
+    for tree in extracted_trees():
+        path = extract_dir / tree
+        if tree in kept_trees or path.stat().st_mtime > tree_cutoff:
+            continue
+        with extract_flight(path):
+            if path.exists() and path.stat().st_mtime <= tree_cutoff:
+                freed += remove(path, dry_run)
+
+    partial_cutoff = min(cutoff, time.time() - 86400)
+    for part in download_dir.rglob("*.part*") if download_dir.exists() else []:
+        if part.is_file() and part.stat().st_mtime < partial_cutoff:
+            freed += remove(part, dry_run)
+
+    if max_size is not None and not dry_run:
+        freed += store.trim(max_size * 1024 * 1024)
+
+    logger.success(
+        f"{'Would free' if dry_run else 'Freed'} {format_size(freed)} from the download cache."
+    )
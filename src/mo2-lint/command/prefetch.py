@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+
+from loguru import logger
+from step import external_resources as er
+from step.workarounds import fetch_instance_file, instance_files, needs_java
+from util import variables as var
+from util.scheduler import Scheduler
+
+
+def prefetch(games: list[str]):
+    """
+    Downloads, verifies and extracts every artifact an install of the given
+    games would need, so later installs run from the cache.
+
+    Covers Mod Organizer 2, Winetricks, Java (if any game needs it), the games'
+    default plugins, direct-download script extenders and instance file
+    workarounds. All artifacts are fetched concurrently; no prefix or instance
+    is touched.
+
+    Parameters
+    ----------
+    games : list[str]
+        Keys of the games in game_info.yml.
+    """
+
+    java = False
+    plugins: dict[str, None] = {}
+    extenders: dict[str, var.ScriptExtender] = {}
+    files: dict[str, dict] = {}
+    for game in games:
+        game_info = var.resolve_game_info(game)
+        java = java or needs_java(game_info)
+        for plugin in game_info.plugins or ():
+            if plugin in var.plugin_info:
+                plugins[plugin] = None
+            else:
+                logger.warning(f"Plugin '{plugin}' of {game} is not recognized.")
+        for entry in game_info.script_extenders or []:
+            direct = getattr(entry.download, "direct", None)
+            url = direct.get("url") if isinstance(direct, dict) else direct
+            if url:
+                extenders[url] = entry
+        for file_info in instance_files(game_info):
+            if file_info.get("download_url"):
+                files[file_info["download_url"]] = file_info
+
+    logger.info(
+        f"Prefetching resources for {len(games)} game(s): {len(plugins)} plugin(s), {len(extenders)} script extender(s), {len(files)} workaround file(s)"
+    )
+    with Scheduler() as scheduler:
+        scheduler.submit("Mod Organizer 2", er.fetch_mod_organizer)
+        scheduler.submit("Winetricks", er.download_winetricks)
+        if java and var.resource_info.java:
+            scheduler.submit("Java", er.fetch_java)
+        for plugin in plugins:
+            scheduler.submit(f"plugin {plugin}", er.fetch_plugin, plugin)
+        for url, entry in extenders.items():
+            scheduler.submit(
+                f"script extender {entry.version} ({url})",
+                er.fetch_scriptextender,
+                entry,
+            )
+        for url, file_info in files.items():
+            scheduler.submit(f"workaround file {url}", fetch_instance_file, file_info)
+
+        failed = []
+        for name in list(scheduler.jobs):
+            try:
+                result = scheduler.result(name)
+            except (Exception, SystemExit):
+                logger.exception(f"Failed to prefetch {name}.")
+                failed.append(name)
+                continue
+            if result is None and name != "Winetricks":
+                failed.append(name)
+
+    if failed:
+        logger.critical(f"Failed to prefetch: {', '.join(failed)}")
+        raise SystemExit(1)
+    logger.success(f"Prefetched {len(scheduler.jobs)} resources.")
@@ -0,0 +1,382 @@
+#!/usr/bin/env python3
+
+from dataclasses import dataclass
+from pathlib import Path
+
+from loguru import logger
+from step.external_resources import download_dir, extract_dir
+from util import archive
+from util import state_file as state
+from util import variables as var
+from util.cache import store
+from util.checksum import get_checksums
+from util.redirector.install import redirector_build
+
+
+@dataclass
+class Check:
+    """
+    Stores a single installed file to check.
+
+    Parameters
+    -----------
+    instance : InstanceData
+        The instance the file belongs to.
+    name : str
+        What the file is, for the log.
+    path : Path
+        The installed file.
+    expected : str | Path | None
+        The expected SHA-256 checksum, or the source file the installed file
+        was copied from. None if the file is only required to exist.
+    size : int, optional
+        The expected size of the file in bytes, if known.
+    crc : int, optional
+        The expected CRC-32 of the file, for files installed straight from
+        a zip archive whose checksums aren't known.
+    """
+
+    instance: state.InstanceData
+    name: str
+    path: Path
+    expected: str | Path | None = None
+    size: int | None = None
+    crc: int | None = None
+
+
+def game_dir(instance: state.InstanceData) -> Path | None:
+    """
+    Returns the folder of the game an instance belongs to, see util.redirector.install.
+    """
+
+    if not instance.game_path:
+        return None
+    path = Path(instance.game_path)
+    return path if path.is_dir() else path.parent
+
+
+def scriptextender_source(instance: state.InstanceData) -> Path | None:
+    """
+    Returns the cached, extracted files of the script extender version an
+    instance has installed, or None if they are no longer cached.
+    """
+
+    game_info = var.resolve_game_info(instance.game)
+    for entry in game_info.script_extenders or []:
+        if entry.version != instance.script_extender or not entry.download:
+            continue
+        download = entry.download
+        direct = download.direct
+        url = direct.get("url") if isinstance(direct, dict) else direct
+        if url:
+            name = url.split("/")[-1]
+        elif download.nexus:
+            nexus = download.nexus
+            digest = store.lookup(
+                f"nexus:{game_info.nexus_slug}/{nexus.get('mod')}/{nexus.get('file')}"
+            )
+            item = store.entry(digest) if digest else None
+            name = item.name if item else None
+        else:
+            name = None
+        source = extract_dir / "scriptextender" / name if name else None
+        if source and entry.file_whitelist and entry.file_whitelist.subdirectory:
+            source = source / entry.file_whitelist.subdirectory
+        if source and source.is_dir():
+            return source
+    return None
+
+
+def plugin_archive(name: str) -> Path | None:
+    """
+    Returns the most recently downloaded archive of a plugin, or None if it
+    is no longer cached.
+    """
+
+    cached = download_dir / "plugins" / name
+    archives = (
+        [file for file in cached.iterdir() if file.is_file()] if cached.is_dir() else []
+    )
+    return max(archives, key=lambda file: file.lstat().st_mtime, default=None)
+
+
+def plugin_sources(name: str, install_dir: Path) -> list[tuple[Path, Path]] | None:
+    """
+    Pairs the installed files or folders of a plugin with the cached, extracted
+    ones they were copied from, following the rules of step.external_resources.install.
+
+    Only a folder whose extraction stamp names the plugin's current archive is
+    used, so a folder left over from an older version isn't compared.
+    Manifest-based plugins only resolve their whitelist at install time, so
+    their top-level entries that are present in install_dir are paired instead.
+
+    Returns
+    -------
+    list[tuple[Path, Path]] | None
+        (source, installed) pairs, or None if the plugin is no longer cached.
+    """
+
+    plugin = var.plugin_info.get(name) if var.plugin_info else None
+    downloaded = plugin_archive(name)
+    cached = extract_dir / "plugins" / name
+    if plugin is None or downloaded is None or not cached.is_dir():
+        return None
+    digest = archive.archive_digest(downloaded)
+    source = next(
+        (
+            tree
+            for tree in cached.iterdir()
+            if (stamp := archive.read_stamp(tree)) and stamp.archive == digest
+        ),
+        None,
+    )
+    if source is None:
+        return None
+    whitelist = plugin.file_whitelist
+    if whitelist and whitelist.subdirectory:
+        source = source / whitelist.subdirectory
+    if whitelist and whitelist.paths:
+        return [
+            (source / path, install_dir / Path(path).name) for path in whitelist.paths
+        ]
+    if whitelist or plugin.direct:
+        return [(source, install_dir)]
+    return [
+        (entry, install_dir / entry.name)
+        for entry in source.iterdir()
+        if (install_dir / entry.name).exists()
+    ]
+
+
+def plugin_archive_checks(
+    instance: state.InstanceData, name: str, install_dir: Path
+) -> list[Check] | None:
+    """
+    Lists the files of a plugin installed straight from its zip archive, see
+    util.archive.extract. They are checked against the size and CRC-32
+    recorded for them in the archive.
+
+    Returns
+    -------
+    list[Check] | None
+        The checks, or None if the plugin's archive is no longer cached.
+    """
+
+    plugin = var.plugin_info.get(name) if var.plugin_info else None
+    source = plugin_archive(name)
+    if plugin is None or source is None:
+        return None
+    infos = archive.members(source)
+    if infos is None:
+        return None
+    whitelist = plugin.file_whitelist
+    checks = []
+    for member, info in infos.items():
+        paths = archive.install_path(member, whitelist)
+        if paths is None:
+            continue
+        if not whitelist:
+            # manifest-based plugins resolve their whitelist at install time
+            top = install_dir / paths[1].parts[0]
+            if not top.exists():
+                continue
+        path = install_dir / paths[1]
+        checks.append(
+            Check(
+                instance,
+                f"plugin {name} {path.relative_to(instance.instance_path / 'plugins')}",
+                path,
+                size=info.file_size,
+                crc=info.CRC,
+            )
+        )
+    return checks
+
+
+def instance_checks(instance: state.InstanceData) -> list[Check]:
+    """
+    Lists the files of an instance to check: the Mod Organizer 2 executable
+    (and manifest files), the redirector, the script extender files and the
+    installed plugin files.
+    """
+
+    checks: list[Check] = []
+    mo2 = var.resource_info.mod_organizer
+    instance_path = Path(instance.instance_path)
+    if mo2.path_internal:
+        # pinned instances may run a build from a local archive
+        checks.append(
+            Check(
+                instance,
+                "Mod Organizer 2",
+                instance_path / mo2.path_internal,
+                None if instance.pin else mo2.checksum_internal,
+                None if instance.pin else mo2.size_internal,
+            )
+        )
+    if not instance.pin:
+        for name, expected in (mo2.manifest or {}).items():
+            checks.append(
+                Check(
+                    instance,
+                    name,
+                    instance_path / name,
+                    expected.checksum,
+                    expected.size,
+                )
+            )
+
+    game_path = game_dir(instance)
+    if game_path:
+        checks.append(
+            Check(
+                instance,
+                "redirector",
+                game_path / "mo2-redirector.exe",
+                redirector_build,
+            )
+        )
+
+    if instance.script_extender_files and game_path:
+        source = scriptextender_source(instance)
+        if source is None:
+            logger.debug(
+                f"Script extender {instance.script_extender} is no longer cached; only checking that its files exist."
+            )
+        for file in instance.script_extender_files:
+            original = source / file if source else None
+            checks.append(
+                Check(
+                    instance,
+                    f"script extender {file}",
+                    Path(instance.game_path) / file,
+                    original if original and original.is_file() else None,
+                )
+            )
+
+    for name in instance.plugins or ():
+        plugin = var.plugin_info.get(name) if var.plugin_info else None
+        install_dir = instance_path / "plugins"
+        if plugin and plugin.subdirectory:
+            install_dir = install_dir / plugin.subdirectory
+        # zip archives record the CRCs of the files installed from them; other
+        # formats are compared with the folder they were extracted to
+        from_archive = plugin_archive_checks(instance, name, install_dir)
+        if from_archive is not None:
+            checks += from_archive
+            continue
+        pairs = plugin_sources(name, install_dir)
+        if pairs is None:
+            logger.debug(f"Plugin {name} is no longer cached; skipping its files.")
+            continue
+        for source, installed in pairs:
+            files = (
+                [
+                    (file, installed / file.relative_to(source))
+                    for file in source.rglob("*")
+                    if file.is_file() and file.name != archive.stamp_name
+                ]
+                if source.is_dir()
+                else [(source, installed)]
+            )
+            for original, path in files:
+                checks.append(
+                    Check(
+                        instance,
+                        f"plugin {name} {path.relative_to(instance_path / 'plugins')}",
+                        path,
+                        original,
+                    )
+                )
+    return checks
+
+
+def verify(game: str | None, directory: Path | None, workers: int | None = None):
+    """
+    Checks the installed files of the matching instances against their
+    expected checksums or the files they were installed from.
+
+    Every file is first checked for existence and size. The rest are hashed
+    in parallel through the verified file index, so files that haven't
+    changed since they were last hashed are not read again.
+
+    Parameters
+    ----------
+    game : str, optional
+        Only check instances of this game.
+    directory : Path, optional
+        Only check instances in this directory.
+    workers : int, optional
+        Number of files to hash at once. Defaults to the number of CPUs.
+    """
+
+    matched = state.match_instances(game, directory)
+    if not matched:
+        logger.error(f"No MO2 instance found for game={game}, directory={directory}")
+        return
+
+    checks = [check for instance in matched for check in instance_checks(instance)]
+    logger.info(f"Verifying {len(checks)} files in {len(matched)} instance(s).")
+
+    problems: dict[int, list[str]] = {}
+    to_hash: list[Check] = []
+    for check in checks:
+        try:
+            size = check.path.stat().st_size
+            if isinstance(check.expected, Path):
+                check.size = check.expected.stat().st_size
+        except OSError:
+            problem = f"{check.name} is missing: {check.path}"
+        else:
+            if check.size is not None and size != check.size:
+                problem = f"{check.name} was modified: {check.path}"
+            elif check.expected is not None or check.crc is not None:
+                to_hash.append(check)
+                continue
+            else:
+                continue
+        problems.setdefault(check.instance.index, []).append(problem)
+
+    # installed copies are compared with their sources using the fast hash,
+    # SHA-256 is only needed for checksums from the config files
+    copies = [check for check in to_hash if isinstance(check.expected, Path)]
+    local = get_checksums(
+        {check.path for check in copies} | {check.expected for check in copies},
+        workers,
+        fast=True,
+    )
+    remote = get_checksums(
+        {check.path for check in to_hash if isinstance(check.expected, str)}, workers
+    )
+    crcs = get_checksums(
+        {check.path for check in to_hash if check.crc is not None},
+        workers,
+        algorithm="crc32",
+    )
+    for check in to_hash:
+        if isinstance(check.expected, Path):
+            matches = local[check.path] == local[check.expected]
+        elif check.crc is not None:
+            matches = crcs[check.path] == f"{check.crc:08x}"
+        else:
+            matches = remote[check.path] == check.expected
+        if not matches:
+            problems.setdefault(check.instance.index, []).append(
+                f"{check.name} was modified: {check.path}"
+            )
+
+    for instance in matched:
+        found = problems.get(instance.index)
+        if not found:
+            logger.success(f"{instance.game} at {instance.instance_path} is intact.")
+            continue
+        logger.error(
+            f"{instance.game} at {instance.instance_path} has {len(found)} missing or modified files:"
+        )
+        for problem in found:
+            logger.error(f"  - {problem}")
+    if problems:
+        logger.critical(
+            f"{len(problems)} of {len(matched)} instance(s) failed verification. Run `mo2-lint update` on them to restore Mod Organizer 2 and the redirector."
+        )
+        raise SystemExit(1)
@@ -1,31 +1,29 @@
 #!/usr/bin/env python3
 
-import json
-import ssl
-import stat
+import os
+from collections.abc import Callable
+from dataclasses import replace
 from pathlib import Path
 from shutil import copyfile as copy
-from shutil import copytree, rmtree
-from urllib.request import Request, urlopen
+from shutil import copytree, ignore_patterns, rmtree
 
-import certifi
 from loguru import logger
-from patoolib import extract_archive as unzip
-from util import lang
+from step.workarounds import fetch_instance_file, instance_files, needs_java
+from util import archive, lang, retry
 from util import state_file as state
 from util import variables as var
-from util.checksum import compare_checksum
+from util.cache import singleflight, store, verified
+from util.cache.store import cache_dir
+from util.checksum import verify_manifest
 from util.download import download as dl
 from util.download import download_nexus as nexus_dl
+from util.scheduler import Scheduler
 from util.state_file import symlink_instance
 from util.theme.gtk_gen import generate_gtk_theme
 from util.theme.kde_gen import generate_kde_theme
 
 from shared.mo2_ini import update_mo2_ini
 
-ssl_context = ssl.create_default_context(cafile=certifi.where())
-
-cache_dir: Path = Path("~/.cache/mo2-lint").expanduser()
 download_dir = cache_dir / "downloads"
 extract_dir = download_dir / "extracted"
 
@@ -121,61 +119,153 @@ def install_auto_theme(destination: Path) -> bool:
     raise SystemExit(1)
 
 
-def download_mod_organizer():
+def fetch_mod_organizer(
+    local_archive: Path | None = None, local_checksum: str | None = None
+) -> Path | None:
     """
-    Runs the download and installation process for Mod Organizer 2.
+    Downloads (or verifies a local archive of) Mod Organizer 2 and extracts it to the cache.
+
+    Parameters
+    ----------
+    local_archive : Path, optional
+        A local .zip/.7z archive to use instead of downloading.
+    local_checksum : str, optional
+        The expected SHA-256 checksum of local_archive.
+
+    Returns
+    -------
+    Path | None
+        The path to the extracted files, or None if extraction failed.
     """
 
     url = var.resource_info.mod_organizer.download_url
     checksum = var.resource_info.mod_organizer.checksum
     path_internal = var.resource_info.mod_organizer.path_internal
     checksum_internal = var.resource_info.mod_organizer.checksum_internal
-    local_archive = var.input_params.mo2_archive
-    destination = var.input_params.directory
-    theme = getattr(var.input_params, "theme", None)
 
     if local_archive:
         local_archive = Path(local_archive)
         logger.info(f"Installing Mod Organizer 2 from local archive: {local_archive}")
-        if not compare_checksum(local_archive, var.input_params.mo2_checksum):
+        if not verified.verify(local_archive, local_checksum):
             logger.critical(
-                f"Checksum mismatch for {local_archive}. Expected {var.input_params.mo2_checksum}."
+                f"Checksum mismatch for {local_archive}. Expected {local_checksum}."
             )
             raise SystemExit(1)
         downloaded = local_archive
-        destination.mkdir(parents=True, exist_ok=True)
     else:
         logger.info("Starting download process for Mod Organizer 2")
         logger.trace(
             f"Download info: url={url}, checksum={checksum}, path_internal={path_internal}, checksum_internal={checksum_internal}"
         )
-        downloaded = dl(url, download_dir, checksum=checksum)
+        downloaded = dl(
+            url,
+            download_dir,
+            checksum=checksum,
+            segments=var.resource_info.mod_organizer.segments,
+            mirrors=var.resource_info.mod_organizer.mirrors,
+            size=var.resource_info.mod_organizer.size,
+        )
         logger.debug(f"Downloaded Mod Organizer 2 to {downloaded}")
 
-    extracted = extract(downloaded, extract_dir / downloaded.stem)
+    def check(tree: Path) -> bool:
+        return check_manifest(tree, var.resource_info.mod_organizer)
+
+    extracted = extract(
+        downloaded, extract_dir / downloaded.stem, None if local_archive else check
+    )
     if extracted and extracted.exists():
         logger.debug(f"Extracted Mod Organizer 2 to {extracted}")
-        mo2_exec = destination / path_internal
-        if (  # if ModOrganizer.exe exists in destination check if it's the same file
-            not local_archive and destination.exists() and mo2_exec.exists()
-        ):
-            if not compare_checksum(
-                mo2_exec, checksum_internal
-            ) and not lang.prompt_install_mo2_checksum_fail(str(mo2_exec)):
-                logger.info(
-                    "User chose not to overwrite existing Mod Organizer 2 executable. Skipping installation."
-                )
-                return
-        elif not destination.exists():
-            destination.mkdir(parents=True, exist_ok=True)
+        if not local_archive and not check(extracted):
+            logger.critical(
+                f"Extracted Mod Organizer 2 files at {extracted} don't match the manifest."
+            )
+            raise SystemExit(1)
+    return extracted
+
+
+def confirm_mod_organizer_overwrite(local_archive: bool = False) -> bool:
+    """
+    Checks an existing Mod Organizer 2 executable in the instance directory
+    against the expected checksum, and asks before overwriting it if it
+    doesn't match.
+
+    Parameters
+    ----------
+    local_archive : bool, optional
+        Whether the files come from a user-supplied archive, in which case the
+        existing executable is not checked.
+
+    Returns
+    -------
+    bool
+        Whether Mod Organizer 2 may be installed over the existing files.
+    """
+
+    mod_organizer = var.resource_info.mod_organizer
+    mo2_exec = var.input_params.directory / mod_organizer.path_internal
+    if local_archive or not mo2_exec.exists():
+        return True
+    return verified.verify(
+        mo2_exec, mod_organizer.checksum_internal, mod_organizer.size_internal
+    ) or lang.prompt_install_mo2_checksum_fail(str(mo2_exec))
+
+
+def install_mod_organizer(
+    extracted: Path | None, local_archive: bool = False, overwrite: bool | None = None
+):
+    """
+    Installs extracted Mod Organizer 2 files into the instance directory.
+
+    Parameters
+    ----------
+    extracted : Path
+        The path to the extracted Mod Organizer 2 files. See fetch_mod_organizer.
+    local_archive : bool, optional
+        Whether the files came from a user-supplied archive, in which case the
+        existing executable is not checked against the expected checksum.
+    overwrite : bool, optional
+        The result of confirm_mod_organizer_overwrite, if it was already
+        asked for. Otherwise the existing executable is checked here.
+    """
+
+    path_internal = var.resource_info.mod_organizer.path_internal
+    destination = var.input_params.directory
+    theme = getattr(var.input_params, "theme", None)
+
+    if extracted and extracted.exists():
+        if overwrite is None:
+            overwrite = confirm_mod_organizer_overwrite(local_archive)
+        if not overwrite:
+            logger.info(
+                "User chose not to overwrite existing Mod Organizer 2 executable. Skipping installation."
+            )
+            return
+        destination.mkdir(parents=True, exist_ok=True)
+    elif local_archive:
+        destination.mkdir(parents=True, exist_ok=True)
     logger.debug(f"Installing Mod Organizer 2 to {destination}")
     install(extracted, destination, None)
+    if extracted and (extracted / path_internal).is_file():
+        # record the copy so the next install doesn't hash it again
+        verified.record(
+            destination / path_internal, verified.checksum(extracted / path_internal)
+        )
     if theme:
         install_theme(theme, destination)
 
     logger.success("Mod Organizer 2 download and installation complete.")
 
 
+def download_mod_organizer():
+    """
+    Runs the download and installation process for Mod Organizer 2.
+    """
+
+    local_archive = var.input_params.mo2_archive
+    extracted = fetch_mod_organizer(local_archive, var.input_params.mo2_checksum)
+    install_mod_organizer(extracted, bool(local_archive))
+
+
 def download_winetricks():
     """
     Runs the download process for Winetricks.
@@ -184,17 +274,31 @@ def download_winetricks():
     url = var.resource_info.winetricks.download_url
     checksum = var.resource_info.winetricks.checksum
     logger.trace(f"Download info: url={url}, checksum={checksum}")
-    downloaded = dl(url, download_dir, "winetricks", checksum=checksum)
+    downloaded = dl(
+        url,
+        download_dir,
+        "winetricks",
+        checksum=checksum,
+        mirrors=var.resource_info.winetricks.mirrors,
+        size=var.resource_info.winetricks.size,
+    )
     if downloaded:
-        downloaded.chmod(downloaded.stat().st_mode | stat.S_IEXEC)
+        # the download links to the stored object, which may be shared and read-only
+        store.make_executable(downloaded)
     logger.success("Winetricks download complete.")
 
 
-def download_java():
+def fetch_java() -> Path | None:
     """
-    Runs the download process for Java.
-    <!-- Called in step.workarounds.apply_workarounds if needed -->
+    Downloads Java and extracts it to the cache. Zip archives are not
+    extracted here, but installed straight from the archive, see download_java.
+
+    Returns
+    -------
+    Path | None
+        The path to the extracted files or zip archive, or None if verification failed.
     """
+
     logger.info("Starting download process for Java")
     url = var.resource_info.java.download_url
     checksum = var.resource_info.java.checksum
@@ -203,16 +307,41 @@ def download_java():
     logger.trace(
         f"Download info: url={url}, checksum={checksum}, path_internal={path_internal}, checksum_internal={checksum_internal}"
     )
-    downloaded = dl(url, download_dir, checksum=checksum)
+    downloaded = dl(
+        url,
+        download_dir,
+        checksum=checksum,
+        segments=var.resource_info.java.segments,
+        mirrors=var.resource_info.java.mirrors,
+        size=var.resource_info.java.size,
+    )
     logger.debug(f"Downloaded Java to {downloaded}")
+    if downloaded and archive.members(downloaded) is not None:
+        return downloaded
     extracted = extract(downloaded, extract_dir / downloaded.stem)
 
     if extracted and extracted.exists():
         logger.debug(f"Extracted Java to {extracted}")
-        if not compare_checksum(extracted / path_internal, checksum_internal):
+        if not verified.verify(
+            extracted / path_internal,
+            checksum_internal,
+            var.resource_info.java.size_internal,
+        ) or not check_manifest(extracted, var.resource_info.java):
             downloaded.unlink(missing_ok=True)
-            extracted.rmdir()
-            return
+            with extract_flight(extracted):
+                rmtree(extracted, ignore_errors=True)
+            return None
+    return extracted
+
+
+def download_java():
+    """
+    Runs the download process for Java.
+    <!-- Called in step.workarounds.apply_workarounds if needed -->
+    """
+    fetched = fetch_java()
+    if fetched is None:
+        return
 
     match state.current_instance.launcher:
         case "steam":
@@ -231,16 +360,31 @@ def download_java():
     logger.debug(
         f"Installing Java to {install_dir} with file whitelist: {file_whitelist}"
     )
-    install(extracted, install_dir, file_whitelist)
+    if fetched.is_file():
+        archive.extract(fetched, install_dir, file_whitelist)
+        if not check_installed(var.resource_info.java, install_dir):
+            logger.error(
+                f"Java files installed from {fetched.name} don't match their checksums."
+            )
+            fetched.unlink(missing_ok=True)
+            rmtree(install_dir)
+            return
+    else:
+        install(fetched, install_dir, file_whitelist)
     logger.success("Java download and installation complete.")
 
 
-def download_scriptextender():
+def choose_scriptextender() -> var.ScriptExtender | None:
     """
-    Runs the download and installation process for the game's script extender.
+    Selects the script extender entry matching the current launcher, prompting
+    the user if more than one matches.
+
+    Returns
+    -------
+    ScriptExtender | None
+        The chosen script extender entry, or None if no entry matches.
     """
 
-    logger.info("Starting download process for the game's script extender")
     game_info = var.game_info
     script_extenders = game_info.script_extenders if game_info is not None else None
     matches = {}
@@ -260,7 +404,7 @@ def download_scriptextender():
         match_count = len(matches)
         keys = list(matches.keys())
         if match_count < 1 or None:
-            return
+            return None
         elif match_count == 1:
             choice = matches[keys[0]]
         elif match_count > 1:
@@ -268,13 +412,30 @@ def download_scriptextender():
             index = keys[choice] if 0 <= choice < match_count else None
             choice = matches[index] if index is not None else None
     else:
-        return
+        return None
     logger.debug(f"Chosen script extender entry: {choice}")
+    return choice
+
+
+def fetch_scriptextender(choice: var.ScriptExtender | None) -> Path | None:
+    """
+    Downloads the chosen script extender and extracts it to the cache.
+
+    Parameters
+    ----------
+    choice : ScriptExtender
+        The script extender entry to download. See choose_scriptextender.
+
+    Returns
+    -------
+    Path | None
+        The path to the extracted files, or None if the download failed.
+    """
 
-    src = [None, None, None]  # [download source, checksum, file whitelist]
+    src = [None, None]  # [download source, checksum]
     downloaded = None
     if choice is None:
-        return
+        return None
     else:
         download_info = getattr(choice, "download", None)
         if getattr(download_info, "direct", None):
@@ -307,15 +468,19 @@ def download_scriptextender():
             else:
                 src[1] = getattr(download_info, "checksum", None)
         else:
-            return
-        src[2] = getattr(choice, "file_whitelist", None)
+            return None
 
         logger.info(
             "Starting download of script extender using method determined from manifest."
         )
         logger.trace(f"Download source: {src[0]}, checksum: {src[1]}")
         if src[0].startswith("http"):
-            downloaded = dl(src[0], download_dir, checksum=src[1])
+            downloaded = dl(
+                src[0],
+                download_dir,
+                checksum=src[1],
+                mirrors=getattr(download_info, "mirrors", None),
+            )
         elif src[0].startswith("nxm"):
             downloaded = nexus_dl(
                 var.game_info.nexus_slug,
@@ -333,12 +498,32 @@ def download_scriptextender():
         logger.warning(
             "This may be due to an invalid API key or lack of Nexus Premium subscription."
         )
-        return
+        return None
 
     extract_path = extract_dir / "scriptextender" / downloaded.name
     extract(downloaded, extract_path)
     logger.debug(f"Extracted script extender to {extract_path}")
-    installed_files = install_scriptextender(extract_path, src[2] if src[2] else None)
+    return extract_path
+
+
+def apply_scriptextender(choice: var.ScriptExtender | None, extracted: Path | None):
+    """
+    Installs an extracted script extender and tracks its files in the current instance.
+
+    Parameters
+    ----------
+    choice : ScriptExtender
+        The script extender entry that was downloaded.
+    extracted : Path
+        The path to the extracted script extender files. See fetch_scriptextender.
+    """
+
+    if choice is None or extracted is None:
+        return
+    whitelist = getattr(choice, "file_whitelist", None)
+    installed_files = install_scriptextender(
+        extracted, whitelist if whitelist else None
+    )
 
     if choice and getattr(choice, "version", None):
         state.current_instance.script_extender = choice.version
@@ -349,6 +534,16 @@ def download_scriptextender():
     logger.success("Script extender download and installation complete.")
 
 
+def download_scriptextender():
+    """
+    Runs the download and installation process for the game's script extender.
+    """
+
+    logger.info("Starting download process for the game's script extender")
+    choice = choose_scriptextender()
+    apply_scriptextender(choice, fetch_scriptextender(choice))
+
+
 def install_scriptextender(
     source: Path, whitelist: var.FileWhitelist | None = None
 ) -> list[str]:
@@ -417,19 +612,25 @@ def install_scriptextender(
     return installed_files
 
 
-def download_plugin(plugin: str):
+def fetch_plugin(plugin: str) -> tuple[Path, var.FileWhitelist | None] | None:
     """
-    Downloads and installs the specified plugin from its manifest or direct URL.
+    Resolves a plugin from its manifest or direct URL, downloads it and extracts it to the cache.
 
     Parameters
     ----------
     plugin : str
         The identifier of the plugin to download.
+
+    Returns
+    -------
+    tuple[Path, FileWhitelist | None] | None
+        The path to the extracted files (or the zip archive) and the whitelist
+        of files to install, or None if the plugin could not be resolved.
     """
 
     logger.info(f"Starting download process for plugin: {plugin}")
     if plugin not in var.plugin_info:
-        return
+        return None
     plugin_obj = var.plugin_info[plugin]
     url = None
     checksum = None
@@ -442,11 +643,11 @@ def download_plugin(plugin: str):
         logger.debug(f"Using direct download URL for plugin {plugin}: {url}")
     elif plugin_obj.manifest:
         logger.debug(f"Found manifest URL for plugin {plugin}: {plugin_obj.manifest}")
-        req = Request(plugin_obj.manifest)
-        with urlopen(req, context=ssl_context) as response:
-            data = json.loads(response.read())
+        response = retry.request(plugin_obj.manifest, name=f"{plugin} manifest")
+        response.raise_for_status()
+        data = response.json()
         if not data:
-            return
+            return None
         latest = data.get("Versions", [])[-1]
         file_path = latest.get("PluginPath")
         if file_path:
@@ -460,36 +661,142 @@ def download_plugin(plugin: str):
         )
 
     if not url:
-        return
+        return None
 
     destination = download_dir / "plugins" / plugin
     downloaded = dl(url, destination, url.split("/")[-1], checksum=checksum)
     logger.debug(f"Downloaded plugin {plugin} to {downloaded}")
+    if downloaded and archive.members(downloaded) is not None:
+        # zip archives are installed straight from the archive, see install_plugin
+        return downloaded, file_whitelist
 
     extract_dest = extract_dir / "plugins" / plugin / downloaded.name
     extract(downloaded, extract_dest)
     logger.debug(f"Extracted plugin {plugin} to {extract_dest}")
+    return extract_dest, file_whitelist
+
 
+def install_plugin(plugin: str, fetched: tuple[Path, var.FileWhitelist | None] | None):
+    """
+    Installs an extracted plugin into the instance's plugins directory.
+
+    Parameters
+    ----------
+    plugin : str
+        The identifier of the plugin to install.
+    fetched : tuple[Path, FileWhitelist | None]
+        The extracted plugin files or zip archive, and the whitelist. See fetch_plugin.
+    """
+
+    if not fetched:
+        return
+    extract_dest, file_whitelist = fetched
+    plugin_obj = var.plugin_info[plugin]
     install_dir = var.input_params.directory / "plugins"
     if plugin_obj.subdirectory:
         install_dir = install_dir / plugin_obj.subdirectory
     logger.trace(
         f"Installing plugin {plugin} to {install_dir} with whitelist {file_whitelist}"
     )
-    install(extract_dest, install_dir, file_whitelist)
+    if extract_dest.is_file():
+        archive.extract(extract_dest, install_dir, file_whitelist)
+    else:
+        install(extract_dest, install_dir, file_whitelist)
     logger.success(f"Plugin {plugin} download and installation complete.")
 
 
-def extract(target: Path, destination: Path) -> Path:
+def download_plugin(plugin: str):
+    """
+    Downloads and installs the specified plugin from its manifest or direct URL.
+
+    Parameters
+    ----------
+    plugin : str
+        The identifier of the plugin to download.
+    """
+
+    install_plugin(plugin, fetch_plugin(plugin))
+
+
+def check_manifest(extracted: Path, resource: var.Resource) -> bool:
+    """
+    Checks extracted resource files against the resource's manifest, if it has one.
+    See util.checksum.verify_manifest.
+
+    Returns
+    -------
+    bool
+        True if every file in the manifest matches, or there is no manifest.
+    """
+
+    if not resource.manifest:
+        return True
+    failed = verify_manifest(extracted, resource.manifest)
+    for name in failed:
+        logger.error(f"{extracted / name} is missing or doesn't match the manifest.")
+    return not failed
+
+
+def check_installed(resource: var.Resource, destination: Path) -> bool:
+    """
+    Checks the internal file and manifest of a resource installed straight
+    from its archive, see util.archive.extract. Paths in the archive are
+    mapped through the resource's file whitelist.
+
+    Returns
+    -------
+    bool
+        True if every whitelisted file with a known checksum matches.
+    """
+
+    whitelist = resource.file_whitelist
+    if resource.path_internal and resource.checksum_internal:
+        paths = archive.install_path(str(resource.path_internal), whitelist)
+        if paths and not verified.verify(
+            destination / paths[1], resource.checksum_internal, resource.size_internal
+        ):
+            return False
+    manifest = {}
+    for name, expected in (resource.manifest or {}).items():
+        paths = archive.install_path(name, whitelist)
+        if paths:
+            manifest[str(paths[1])] = expected
+    return check_manifest(destination, replace(resource, manifest=manifest))
+
+
+def extract_flight(destination: Path):
+    """
+    Locks an extraction folder against concurrent extractions, and against
+    `cache gc` removing it, see util.cache.singleflight.flight.
+    """
+
+    return singleflight.flight(
+        f"extract:{destination}", f"extraction to {destination.name}"
+    )
+
+
+def extract(
+    target: Path, destination: Path, check: Callable[[Path], bool] | None = None
+) -> Path:
     """
     Extracts the specified archive to the given destination.
 
+    Extraction is atomic, see util.archive.extract_tree, and uses the
+    backend chosen for the archive's format, see util.archive.select_backend.
+    An existing destination is reused only if its completion stamp names the
+    same archive and it passes check; otherwise, e.g. after an interrupted
+    extraction, it is replaced.
+
     Parameters
     ----------
     target : Path
         The archive file to extract.
     destination : Path
         The directory to extract the archive into.
+    check : Callable[[Path], bool], optional
+        Validates an existing destination, e.g. against a manifest. It runs
+        while the destination is locked, so no other extraction replaces the
+        folder in between.
 
     Returns
     -------
@@ -499,14 +806,26 @@ def extract(target: Path, destination: Path) -> Path:
     if not target.exists():
         logger.warning(f"Target archive {target} does not exist. Extraction skipped.")
         return None
-    if destination.exists():
-        logger.trace(
-            f"Destination {destination} already exists. Skipping to avoid conflicts."
-        )
-        return destination
-    logger.trace(f"Extracting archive {target} to destination {destination}")
-    unzip(str(target), outdir=destination)
-    logger.trace(f"Extraction of {target} complete.")
+    # concurrent extractions to the same place run only once
+    with extract_flight(destination):
+        digest = archive.archive_digest(target)
+        stamp = archive.read_stamp(destination)
+        if stamp and stamp.archive == digest:
+            if check is None or check(destination):
+                logger.trace(
+                    f"{destination} was already extracted from {target.name}; reusing it."
+                )
+                # mark the tree as used, so `cache gc` leaves it alone for a while
+                os.utime(destination)
+                return destination
+            logger.warning(f"{destination} is damaged. Extracting again.")
+        elif destination.exists():
+            logger.debug(
+                f"{destination} is incomplete or from another archive. Extracting again."
+            )
+        logger.trace(f"Extracting archive {target} to destination {destination}")
+        stamp = archive.extract_tree(target, destination, digest)
+        logger.trace(f"Extraction of {target} complete ({stamp.members} files).")
     return destination
 
 
@@ -555,9 +874,14 @@ def install(
         if source.is_dir():
             # Collect all files from source before copying
             for item in source.rglob("*"):
-                if item.is_file():
+                if item.is_file() and item.name != archive.stamp_name:
                     installed_files.append(str(item.relative_to(source)))
-            copytree(source, destination, dirs_exist_ok=True)
+            copytree(
+                source,
+                destination,
+                dirs_exist_ok=True,
+                ignore=ignore_patterns(archive.stamp_name),
+            )
         elif source.is_file():
             copy(source, destination)
             installed_files.append(source.name)
@@ -594,6 +918,10 @@ def install(
 def download():
     """
     Runs the download process for all required external resources.
+
+    Downloads and extractions run concurrently on a Scheduler; the results
+    are then installed one at a time, in a fixed order. Archives of instance
+    file workarounds are fetched alongside, so the workarounds step reuses them.
     """
     cache_dir.mkdir(parents=True, exist_ok=True)
     params = var.input_params
@@ -601,16 +929,12 @@ def download():
     script_extenders = game_info.script_extenders if game_info is not None else None
 
     logger.info("Starting download of external resources.")
-    download_mod_organizer()
     game_plugins = tuple(getattr(game_info, "plugins", None) or ())
     all_plugins = list(params.plugins or ())
     for p in game_plugins:
         if p not in all_plugins:
             all_plugins.append(p)
-    if all_plugins:
-        for plugin in all_plugins:
-            download_plugin(plugin)
-    download_winetricks()
+    script_extender = None
     if params.script_extender:
         match = False
         for entry in script_extenders or []:
@@ -624,6 +948,42 @@ def download():
                     match = True
                     break
         if match:
-            download_scriptextender()
+            logger.info("Starting download process for the game's script extender")
+            script_extender = choose_scriptextender()
+
+    # ask before any download starts, so the prompt isn't interleaved with the
+    # progress of downloads running in the background
+    overwrite = confirm_mod_organizer_overwrite(bool(params.mo2_archive))
+    with Scheduler() as scheduler:
+        scheduler.submit(
+            "mod_organizer",
+            fetch_mod_organizer,
+            params.mo2_archive,
+            params.mo2_checksum,
+        )
+        for plugin in all_plugins:
+            scheduler.submit(f"plugin:{plugin}", fetch_plugin, plugin)
+        scheduler.submit("winetricks", download_winetricks)
+        if script_extender:
+            scheduler.submit("script_extender", fetch_scriptextender, script_extender)
+        if needs_java() and var.resource_info.java:
+            scheduler.submit("java", fetch_java)
+        for file_info in instance_files():
+            if file_info.get("download_url"):
+                scheduler.submit(
+                    f"workaround:{file_info['download_url']}",
+                    fetch_instance_file,
+                    file_info,
+                )
+
+        install_mod_organizer(
+            scheduler.result("mod_organizer"), bool(params.mo2_archive), overwrite
+        )
+        for plugin in all_plugins:
+            install_plugin(plugin, scheduler.result(f"plugin:{plugin}"))
+        if script_extender:
+            apply_scriptextender(script_extender, scheduler.result("script_extender"))
+        scheduler.wait()
+    retry.report()
     symlink_instance()
     logger.success("All external resources downloaded and installed successfully.")
@@ -6,40 +6,117 @@ from pathlib import Path
 from shutil import copyfile
 
 from loguru import logger
+from util import archive
 from util import state_file as state
 from util import variables as var
-from util.checksum import compare_checksum
+from util.cache import store
 from util.internal_file import internal_file
 
 
-def apply_instance_files(files: list[dict]):
+def needs_java(game_info: var.GameInfo | None = None) -> bool:
+    """
+    Checks whether a game's workarounds require Java.
+
+    Parameters
+    ----------
+    game_info : GameInfo, optional
+        The game to check. Defaults to the currently loaded game.
+
+    Returns
+    -------
+    bool
+        True if the game has a `needs_java: true` workaround.
+    """
+
+    game_info = game_info or var.game_info
+    for w in (game_info.workarounds if game_info else None) or []:
+        if isinstance(w, dict) and w.get("needs_java") is True:
+            return True
+    return False
+
+
+def instance_files(game_info: var.GameInfo | None = None) -> list[dict]:
+    """
+    Lists the `instance_files` workaround entries of a game.
+
+    Parameters
+    ----------
+    game_info : GameInfo, optional
+        The game to check. Defaults to the currently loaded game.
+    """
+
+    game_info = game_info or var.game_info
+    files = []
+    for w in (game_info.workarounds if game_info else None) or []:
+        if isinstance(w, dict):
+            files.extend(w.get("instance_files") or [])
+    return files
+
+
+def fetch_instance_file(file_info: dict) -> Path | None:
+    """
+    Fetches the file of an instance file workaround and verifies it.
+
+    With a `checksum_internal`, only the file itself is extracted from the
+    archive and kept in the content store under that checksum, see
+    util.archive.fetch_member. Later calls reuse it without downloading or
+    opening the archive. Without one, the whole archive is extracted.
+
+    Parameters
+    ----------
+    file_info : dict
+        The `instance_files` workaround entry.
+
+    Returns
+    -------
+    Path | None
+        The path to the file, or None if the entry is invalid.
+    """
+
     from util.download import download
 
     from .external_resources import download_dir, extract, extract_dir
 
+    url = file_info.get("download_url")
+    source = file_info.get("path_internal")
+    if not url or not source:
+        logger.warning(f"Skipping invalid instance file workaround: {file_info}")
+        return None
+
+    checksum_internal = file_info.get("checksum_internal")
+    if checksum_internal:
+        stored = store.get(checksum_internal)
+        if stored:
+            logger.trace(f"Reusing stored instance file workaround {source}.")
+            return stored
+
+    logger.debug(f"Downloading instance file workaround source: {url}")
+    downloaded = download(
+        url, download_dir / "workarounds", checksum=file_info.get("checksum")
+    )
+    if not checksum_internal:
+        extracted = extract(downloaded, extract_dir / "workarounds" / downloaded.stem)
+        return extracted / source
+
+    src = archive.fetch_member(
+        downloaded, source, checksum_internal, file_info.get("size_internal")
+    )
+    if src is None:
+        logger.critical(
+            f"Checksum mismatch for workaround file {source} in {downloaded.name}. Expected {checksum_internal}."
+        )
+        raise SystemExit(1)
+    return src
+
+
+def apply_instance_files(files: list[dict]):
     instance_path = Path(state.current_instance.instance_path)
-    workaround_dir = download_dir / "workarounds"
 
     for file_info in files:
-        url = file_info.get("download_url")
-        source = file_info.get("path_internal")
-        destination = file_info.get("destination") or source
-
-        if not url or not source:
-            logger.warning(f"Skipping invalid instance file workaround: {file_info}")
+        src = fetch_instance_file(file_info)
+        if src is None:
             continue
-
-        logger.debug(f"Downloading instance file workaround source: {url}")
-        downloaded = download(url, workaround_dir, checksum=file_info.get("checksum"))
-        extracted = extract(downloaded, extract_dir / "workarounds" / downloaded.stem)
-        src = extracted / source
-
-        checksum_internal = file_info.get("checksum_internal")
-        if checksum_internal and not compare_checksum(src, checksum_internal):
-            logger.critical(
-                f"Checksum mismatch for workaround file {src}. Expected {checksum_internal}."
-            )
-            raise SystemExit(1)
+        destination = file_info.get("destination") or file_info.get("path_internal")
 
         dest = instance_path / destination
         dest.parent.mkdir(parents=True, exist_ok=True)
@@ -0,0 +1,507 @@
+#!/usr/bin/env python3
+
+import functools
+import json
+import os
+import shutil
+import subprocess
+import tempfile
+import threading
+import zipfile
+from collections.abc import Callable
+from dataclasses import dataclass
+from pathlib import Path, PurePosixPath
+
+from loguru import logger
+from patoolib import extract_archive as unzip
+from util import variables as var
+
+copy_buffer = 1024 * 1024
+stamp_name = ".mo2-lint-extracted.json"
+seven_zip_signature = b"7z\xbc\xaf\x27\x1c"
+
+_lock = threading.Lock()
+_slots: threading.BoundedSemaphore | None = None
+
+
+@dataclass
+class ExtractStamp:
+    """
+    Stores the completion stamp of an extracted archive, written as the last
+    step before the extracted folder is moved into place.
+
+    Parameters
+    -----------
+    archive : str
+        The SHA-256 checksum of the archive the folder was extracted from.
+    members : int
+        Number of files extracted.
+    """
+
+    archive: str
+    members: int
+
+    @staticmethod
+    def from_dict(data: dict) -> "ExtractStamp":
+        return ExtractStamp(archive=data["archive"], members=int(data["members"]))
+
+    def to_dict(self) -> dict:
+        return {"archive": self.archive, "members": self.members}
+
+
+def archive_format(archive: Path) -> str:
+    """
+    Returns the format of an archive from its signature: "zip", "7z", or
+    "other" for anything else, which is left to patool.
+    """
+
+    if zipfile.is_zipfile(archive):
+        return "zip"
+    with open(archive, "rb") as f:
+        if f.read(len(seven_zip_signature)) == seven_zip_signature:
+            return "7z"
+    return "other"
+
+
+@functools.cache
+def seven_zip() -> str | None:
+    """
+    Returns the path of the 7-Zip executable, or None if it isn't installed.
+    """
+
+    for name in ("7zz", "7z", "7za"):
+        path = shutil.which(name)
+        if path:
+            return path
+    return None
+
+
+def extract_zipfile(archive: Path, outdir: Path):
+    """
+    Extracts a zip archive in-process. zipfile drops absolute paths and ".."
+    components from member names, so nothing is written outside outdir.
+    """
+
+    with zipfile.ZipFile(archive) as zf:
+        zf.extractall(outdir)
+
+
+def extract_7z(archive: Path, outdir: Path):
+    """
+    Extracts an archive with the 7-Zip executable, which decompresses LZMA2
+    on all CPU cores.
+    """
+
+    subprocess.run(
+        [seven_zip(), "x", "-y", "-mmt=on", "-bd", f"-o{outdir}", "--", str(archive)],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+        check=True,
+    )
+
+
+def extract_patool(archive: Path, outdir: Path):
+    """
+    Extracts an archive of any format patool supports.
+    """
+
+    unzip(str(archive), outdir=str(outdir))
+
+
+backends: dict[str, Callable[[Path, Path], None]] = {
+    "zipfile": extract_zipfile,
+    "7z": extract_7z,
+    "patool": extract_patool,
+}
+
+
+def available_backends() -> list[str]:
+    """
+    Returns the extraction backends that can run on this system.
+    """
+
+    return [name for name in backends if name != "7z" or seven_zip()]
+
+
+def select_backend(archive: Path) -> str:
+    """
+    Chooses the extraction backend for an archive by its format.
+
+    Zip archives are extracted in-process with zipfile. 7z archives use the
+    7-Zip executable if it is installed, since it decompresses on all cores.
+    Everything else, and 7z archives without it, go through patool.
+    """
+
+    match archive_format(archive):
+        case "zip":
+            return "zipfile"
+        case "7z" if seven_zip():
+            return "7z"
+    return "patool"
+
+
+def extract_with(archive: Path, outdir: Path, backend: str | None = None) -> str:
+    """
+    Extracts a whole archive into an existing folder.
+
+    Parameters
+    ----------
+    archive : Path
+        The archive to extract.
+    outdir : Path
+        The folder to extract the archive into.
+    backend : str, optional
+        The backend to use, see backends. Chosen by format if not provided.
+
+    Returns
+    -------
+    str
+        The backend that extracted the archive.
+    """
+
+    backend = backend or select_backend(archive)
+    logger.trace(f"Extracting {archive.name} with {backend}.")
+    backends[backend](archive, outdir)
+    return backend
+
+
+def extract_slots() -> threading.BoundedSemaphore:
+    """
+    Returns the semaphore limiting how many archives are extracted at once,
+    sized by the `[download] extract_workers` setting.
+    """
+
+    global _slots
+    with _lock:
+        if _slots is None:
+            download = var.settings.download if var.settings else var.DownloadSettings()
+            workers = download.extract_workers or os.cpu_count() or 1
+            _slots = threading.BoundedSemaphore(workers)
+            logger.trace(f"Extracting up to {workers} archives at once")
+    return _slots
+
+
+def archive_digest(archive: Path) -> str:
+    """
+    Returns the SHA-256 checksum of an archive. Stored archives are named
+    after their checksum, so they aren't read.
+    """
+
+    from util.cache import store, verified
+
+    if archive.is_symlink() and archive.readlink().parent.parent == store.objects_dir():
+        return archive.readlink().name
+    return verified.checksum(archive)
+
+
+def read_stamp(destination: Path) -> ExtractStamp | None:
+    """
+    Returns the completion stamp of an extracted folder, or None if it has
+    none, e.g. because its extraction was interrupted.
+    """
+
+    try:
+        return ExtractStamp.from_dict(
+            json.loads((destination / stamp_name).read_text())
+        )
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError, TypeError, KeyError):
+        logger.trace(f"Unreadable extraction stamp in {destination}")
+        return None
+
+
+def extract_tree(
+    archive: Path, destination: Path, digest: str, backend: str | None = None
+) -> ExtractStamp:
+    """
+    Extracts a whole archive atomically, with the backend chosen for its
+    format unless one is given.
+
+    The archive is extracted into a temporary folder next to destination,
+    which gets a completion stamp and is then renamed to destination. An
+    interrupted extraction therefore never leaves a partial tree at
+    destination. An existing destination is replaced.
+
+    Extractions run on the calling thread, so independent archives fetched
+    on a Scheduler are extracted in parallel, up to extract_slots() at once.
+
+    Parameters
+    ----------
+    archive : Path
+        The archive to extract.
+    destination : Path
+        The folder to extract the archive to.
+    digest : str
+        The SHA-256 checksum of the archive, recorded in the stamp.
+    backend : str, optional
+        The extraction backend to use, see select_backend.
+
+    Returns
+    -------
+    ExtractStamp
+        The stamp written to destination.
+    """
+
+    destination.parent.mkdir(parents=True, exist_ok=True)
+    tmp = destination.with_name(
+        f".{destination.name}.{os.getpid()}.{threading.get_ident()}.tmp"
+    )
+    shutil.rmtree(tmp, ignore_errors=True)
+    tmp.mkdir()
+    try:
+        with extract_slots():
+            extract_with(archive, tmp, backend)
+        count = sum(len(files) for _root, _dirs, files in os.walk(tmp))
+        stamp = ExtractStamp(archive=digest, members=count)
+        (tmp / stamp_name).write_text(json.dumps(stamp.to_dict(), indent=2))
+        if destination.exists():
+            shutil.rmtree(destination)
+        os.replace(tmp, destination)
+    except BaseException:
+        shutil.rmtree(tmp, ignore_errors=True)
+        raise
+    return stamp
+
+
+def extract_member(
+    archive: Path, member: str, outdir: Path, backend: str | None = None
+) -> Path:
+    """
+    Extracts a single file of an archive into outdir, keeping its path
+    within the archive.
+
+    Zip members are streamed natively and 7-Zip is asked for the member
+    alone. patool has no way to select members, so with it the whole
+    archive is extracted.
+
+    Parameters
+    ----------
+    archive : Path
+        The archive to extract from.
+    member : str
+        Path of the file within the archive.
+    outdir : Path
+        The folder to extract the file into.
+    backend : str, optional
+        The backend to use, see backends. Chosen by format if not provided.
+
+    Returns
+    -------
+    Path
+        The extracted file.
+
+    Raises
+    ------
+    FileNotFoundError
+        If the archive has no such file.
+    """
+
+    path = PurePosixPath(member.replace("\\", "/"))
+    if path.is_absolute() or ".." in path.parts:
+        raise FileNotFoundError(f"Unsafe archive member: {member}")
+    target = outdir / path
+    backend = backend or select_backend(archive)
+    logger.trace(f"Extracting {member} from {archive.name} with {backend}.")
+    match backend:
+        case "zipfile":
+            with zipfile.ZipFile(archive) as zf:
+                try:
+                    info = zf.getinfo(path.as_posix())
+                except KeyError:
+                    raise FileNotFoundError(
+                        f"{member} not found in {archive.name}"
+                    ) from None
+                target.parent.mkdir(parents=True, exist_ok=True)
+                with zf.open(info) as src, open(target, "wb") as dst:
+                    shutil.copyfileobj(src, dst, copy_buffer)
+        case "7z":
+            subprocess.run(
+                [seven_zip(), "x", "-y", "-mmt=on", "-bd", f"-o{outdir}", "--"]
+                + [str(archive), path.as_posix()],
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.PIPE,
+                check=True,
+            )
+        case _:
+            backends[backend](archive, outdir)
+    if not target.is_file():
+        raise FileNotFoundError(f"{member} not found in {archive.name}")
+    return target
+
+
+def fetch_member(
+    archive: Path, member: str, digest: str, size: int | None = None
+) -> Path | None:
+    """
+    Extracts a single file of an archive into the content store, keyed by
+    the file's own checksum.
+
+    A file that is already stored is returned without opening the archive,
+    so callers that know the checksum can check the store before they even
+    download the archive.
+
+    Parameters
+    ----------
+    archive : Path
+        The archive to extract from.
+    member : str
+        Path of the file within the archive.
+    digest : str
+        The expected SHA-256 checksum of the file.
+    size : int, optional
+        The expected size of the file in bytes.
+
+    Returns
+    -------
+    Path | None
+        The stored file, or None if the extracted file doesn't match digest.
+    """
+
+    from util.cache import singleflight, store
+    from util.checksum import hash_file
+
+    with singleflight.flight(f"member:{digest}", f"extraction of {member}"):
+        cached = store.get(digest)
+        if cached:
+            logger.trace(f"{member} is already stored; skipping {archive.name}.")
+            return cached
+        store.make_dir(store.store_dir())
+        # extract next to the store, so the file is moved into it, not copied
+        with tempfile.TemporaryDirectory(
+            dir=store.store_dir(), prefix=".member."
+        ) as tmp:
+            file = extract_member(archive, member, Path(tmp))
+            if size is not None and file.stat().st_size != size:
+                logger.trace(f"Size mismatch: {member} is not {size} bytes")
+                return None
+            actual = hash_file(file)
+            if actual != digest:
+                logger.trace(f"Checksum mismatch: {actual} != {digest}")
+                return None
+            return store.put(file, digest, name=file.name)
+
+
+def install_path(
+    member: str, whitelist: var.FileWhitelist | None = None
+) -> tuple[PurePosixPath, PurePosixPath] | None:
+    """
+    Returns where an archive member ends up when installed with a whitelist,
+    following the rules of step.external_resources.install.
+
+    Parameters
+    ----------
+    member : str
+        Path of the file within the archive.
+    whitelist : FileWhitelist, optional
+        The subdirectory and paths to install. All files if not provided.
+
+    Returns
+    -------
+    tuple[PurePosixPath, PurePosixPath] | None
+        The path relative to the whitelist subdirectory, as listed in the
+        installed files, and the path relative to the destination. None if
+        the member is not whitelisted or would be written outside the destination.
+    """
+
+    path = PurePosixPath(member.replace("\\", "/"))
+    if path.is_absolute() or ".." in path.parts:
+        logger.warning(f"Skipping unsafe archive member: {member}")
+        return None
+    if whitelist and whitelist.subdirectory:
+        subdirectory = PurePosixPath(whitelist.subdirectory.strip("/"))
+        if path == subdirectory or not path.is_relative_to(subdirectory):
+            return None
+        path = path.relative_to(subdirectory)
+    paths = whitelist.paths if whitelist else None
+    if not paths or tuple(paths) == ("*",):
+        return path, path
+    for entry in paths:
+        entry = PurePosixPath(entry.strip("/"))
+        if path == entry or path.is_relative_to(entry):
+            return path, PurePosixPath(entry.name) / path.relative_to(entry)
+    return None
+
+
+def members(archive: Path) -> dict[str, zipfile.ZipInfo] | None:
+    """
+    Lists the files in an archive with their sizes and CRC-32s, without
+    extracting it.
+
+    Returns
+    -------
+    dict[str, ZipInfo] | None
+        The info of each file, keyed by its path within the archive. None if
+        the archive is not a zip file, whose member list can't be read natively.
+    """
+
+    if not zipfile.is_zipfile(archive):
+        return None
+    with zipfile.ZipFile(archive) as zf:
+        return {info.filename: info for info in zf.infolist() if not info.is_dir()}
+
+
+def extract(
+    archive: Path, destination: Path, whitelist: var.FileWhitelist | None = None
+) -> list[str]:
+    """
+    Extracts the whitelisted files of an archive straight into destination.
+
+    Zip archives are read natively and only the whitelisted members are
+    decompressed, each streamed to its final path. Other formats are
+    extracted whole with the backend chosen for them, see select_backend,
+    into a temporary folder next to destination, from which the whitelisted
+    files are moved into place.
+
+    Parameters
+    ----------
+    archive : Path
+        The archive to extract.
+    destination : Path
+        The folder to install the files into. Existing files are overwritten.
+    whitelist : FileWhitelist, optional
+        The subdirectory and paths to install. All files if not provided.
+
+    Returns
+    -------
+    list[str]
+        The installed files, relative to the whitelist subdirectory, like
+        step.external_resources.install returns them.
+    """
+
+    destination.mkdir(parents=True, exist_ok=True)
+    installed: list[str] = []
+    if zipfile.is_zipfile(archive):
+        logger.trace(f"Extracting whitelisted members of {archive} to {destination}")
+        with zipfile.ZipFile(archive) as zf:
+            for info in zf.infolist():
+                paths = (
+                    None if info.is_dir() else install_path(info.filename, whitelist)
+                )
+                if paths is None:
+                    continue
+                listed, target = paths
+                out = destination / target
+                out.parent.mkdir(parents=True, exist_ok=True)
+                out.unlink(missing_ok=True)
+                with zf.open(info) as src, open(out, "wb") as dst:
+                    shutil.copyfileobj(src, dst, copy_buffer)
+                installed.append(str(listed))
+    else:
+        with tempfile.TemporaryDirectory(
+            dir=destination.parent, prefix=f".{destination.name}."
+        ) as tmp:
+            extract_with(archive, Path(tmp))
+            for root, _dirs, files in os.walk(tmp):
+                for name in files:
+                    file = Path(root) / name
+                    paths = install_path(file.relative_to(tmp).as_posix(), whitelist)
+                    if paths is None:
+                        continue
+                    listed, target = paths
+                    out = destination / target
+                    out.parent.mkdir(parents=True, exist_ok=True)
+                    os.replace(file, out)
+                    installed.append(str(listed))
+    logger.trace(f"Installed {len(installed)} files from {archive.name}.")
+    return installed
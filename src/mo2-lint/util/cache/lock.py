@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+
+import fcntl
+import os
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+
+from loguru import logger
+
+_held = threading.local()
+
+
+@contextmanager
+def locked(path: Path, shared: bool = False, name: str | None = None):
+    """
+    Holds an advisory flock() lock on a lock file for the duration of the block.
+
+    The lock is held per open file, so it excludes other threads of this
+    process as well as other processes and other users sharing the cache.
+    Nested use of the same lock file by the same thread is re-entrant.
+
+    Parameters
+    ----------
+    path : Path
+        The lock file. It is created group-writable if it doesn't exist.
+    shared : bool, optional
+        Take a shared (read) lock instead of an exclusive one.
+    name : str, optional
+        What the lock guards, logged when it has to be waited for.
+    """
+
+    held = _held.__dict__.setdefault("locks", {})
+    if path in held:
+        held[path] += 1
+        try:
+            yield
+        finally:
+            held[path] -= 1
+        return
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o664)
+    try:
+        try:
+            os.fchmod(fd, 0o664)
+        except OSError:
+            pass  # owned by another user
+        mode = fcntl.LOCK_SH if shared else fcntl.LOCK_EX
+        try:
+            fcntl.flock(fd, mode | fcntl.LOCK_NB)
+        except BlockingIOError:
+            if name:
+                logger.debug(f"Waiting for {name} to be released.")
+            else:
+                logger.trace(f"Waiting for {path} to be released.")
+            fcntl.flock(fd, mode)
+        held[path] = 1
+        try:
+            yield
+        finally:
+            del held[path]
+    finally:
+        os.close(fd)
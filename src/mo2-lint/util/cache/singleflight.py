@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+
+import hashlib
+from contextlib import contextmanager
+from pathlib import Path
+
+from util.cache import store
+from util.cache.lock import locked
+
+
+def locks_dir() -> Path:
+    """
+    Returns the folder holding the flight lock files, next to the store so
+    they are shared with other users when the store is.
+    """
+
+    return (store.shared_root() or store.cache_dir) / "locks"
+
+
+@contextmanager
+def flight(key: str, name: str | None = None):
+    """
+    Runs the block as the only producer of an artifact.
+
+    Concurrent callers using the same key, in other threads, processes or
+    (with a shared cache root) other users, wait until the current producer
+    is done. They then run the block themselves, which is expected to find
+    the finished artifact in the store or on disk and return it right away.
+    If the producer failed, the next caller simply tries again.
+
+    Parameters
+    ----------
+    key : str
+        Identifies the artifact, e.g. its checksum or source URL.
+    name : str, optional
+        Name of the artifact, logged when waiting for another producer.
+    """
+
+    folder = locks_dir()
+    store.make_dir(folder)
+    path = folder / f"{hashlib.sha256(key.encode()).hexdigest()[:32]}.lock"
+    with locked(path, name=name or key):
+        yield
+
+
+def run(key: str, fn, *args, name: str | None = None, **kwargs):
+    """
+    Calls fn as the only producer of the artifact identified by key. See flight().
+    """
+
+    with flight(key, name):
+        return fn(*args, **kwargs)
@@ -0,0 +1,468 @@
+#!/usr/bin/env python3
+
+import json
+import os
+import shutil
+import stat
+import threading
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from loguru import logger
+from util import variables as var
+from util.cache.lock import locked
+from util.checksum import hash_file
+
+cache_dir: Path = Path("~/.cache/mo2-lint").expanduser()
+
+# objects this process has stored, found or linked; evicting them could pull
+# an archive out from under a later step of the same run
+_in_use: set[str] = set()
+
+
+@dataclass
+class StoreEntry:
+    """
+    Stores the bookkeeping of a single object in the content store.
+
+    Parameters
+    -----------
+    size : int
+        Size of the object in bytes.
+    last_access : float
+        Unix timestamp of the last time the object was stored or reused.
+    name : str
+        File name the object was first downloaded as.
+    sources : list[str]
+        URLs or source identifiers known to resolve to this object.
+    """
+
+    size: int
+    last_access: float
+    name: str = ""
+    sources: list[str] = field(default_factory=list)
+
+    @staticmethod
+    def from_dict(data: dict) -> "StoreEntry":
+        return StoreEntry(
+            size=int(data.get("size", 0)),
+            last_access=float(data.get("last_access", 0)),
+            name=data.get("name", ""),
+            sources=list(data.get("sources") or []),
+        )
+
+    def to_dict(self) -> dict:
+        return {
+            "size": self.size,
+            "last_access": self.last_access,
+            "name": self.name,
+            "sources": self.sources,
+        }
+
+
+@dataclass
+class StoreIndex:
+    """
+    Stores the index of the content store.
+
+    Parameters
+    -----------
+    objects : dict[str, StoreEntry]
+        Stored objects keyed by their SHA-256 checksum.
+    sources : dict[str, str]
+        Maps URLs or source identifiers to the checksum of the object they resolved to.
+    """
+
+    objects: dict[str, StoreEntry] = field(default_factory=dict)
+    sources: dict[str, str] = field(default_factory=dict)
+
+    @staticmethod
+    def from_dict(data: dict) -> "StoreIndex":
+        return StoreIndex(
+            objects={
+                digest: StoreEntry.from_dict(entry)
+                for digest, entry in (data.get("objects") or {}).items()
+            },
+            sources=dict(data.get("sources") or {}),
+        )
+
+    def to_dict(self) -> dict:
+        return {
+            "objects": {
+                digest: entry.to_dict() for digest, entry in self.objects.items()
+            },
+            "sources": self.sources,
+        }
+
+    def total_size(self) -> int:
+        return sum(entry.size for entry in self.objects.values())
+
+
+def shared_root() -> Path | None:
+    """
+    Returns the system-wide cache root from the `[cache] shared_root` setting, if set.
+    """
+
+    cache = var.settings.cache if var.settings else var.CacheSettings()
+    return cache.shared_root
+
+
+def store_dir() -> Path:
+    """
+    Returns the folder holding the store, in the shared cache root if one is configured.
+    """
+
+    return (shared_root() or cache_dir) / "store"
+
+
+def objects_dir() -> Path:
+    return store_dir() / "objects"
+
+
+def index_file() -> Path:
+    return store_dir() / "index.json"
+
+
+def _lock():
+    """
+    Locks the store against other threads, processes and users.
+    """
+
+    make_dir(store_dir())
+    return locked(store_dir() / ".lock")
+
+
+def make_dir(path: Path):
+    """
+    Creates a folder in the store. In a shared cache root, new folders are
+    group-writable and setgid, so every member of the group can add objects.
+    """
+
+    if path.is_dir():
+        return
+    missing = [p for p in (path, *path.parents) if not p.exists()]
+    path.mkdir(parents=True, exist_ok=True)
+    if shared_root():
+        for folder in missing:
+            try:
+                os.chmod(folder, 0o2775)
+            except OSError:
+                pass  # created by another user in the meantime
+
+
+def object_path(digest: str) -> Path:
+    """
+    Returns the path an object with the given checksum is stored at.
+    """
+
+    return objects_dir() / digest[:2] / digest
+
+
+def load_index() -> StoreIndex:
+    """
+    Loads the store index, or returns an empty one if it doesn't exist or is unreadable.
+    """
+
+    try:
+        with open(index_file()) as f:
+            return StoreIndex.from_dict(json.load(f))
+    except FileNotFoundError:
+        return StoreIndex()
+    except (OSError, ValueError, TypeError, AttributeError):
+        logger.warning(f"Store index at {index_file()} is unreadable; rebuilding it.")
+        return StoreIndex()
+
+
+def save_index(index: StoreIndex):
+    """
+    Writes the store index atomically. The caller must hold the store lock.
+    """
+
+    path = index_file()
+    make_dir(path.parent)
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    with open(tmp, "w") as f:
+        json.dump(index.to_dict(), f, indent=2)
+    os.chmod(tmp, 0o664 if shared_root() else 0o644)
+    os.replace(tmp, path)
+
+
+def lookup(source: str) -> str | None:
+    """
+    Returns the checksum of the object a URL or source identifier last resolved to.
+    """
+
+    with _lock():
+        return load_index().sources.get(source)
+
+
+def entry(digest: str) -> StoreEntry | None:
+    """
+    Returns the index entry of a stored object.
+    """
+
+    with _lock():
+        return load_index().objects.get(digest)
+
+
+def get(digest: str) -> Path | None:
+    """
+    Returns the path of a stored object and marks it as recently used.
+
+    The object is checked against its checksum through the verified file
+    index, so an unchanged object is only confirmed with a stat() call.
+
+    Parameters
+    ----------
+    digest : str
+        The SHA-256 checksum of the object.
+
+    Returns
+    -------
+    Path | None
+        The path to the object, or None if it isn't stored.
+    """
+
+    from util.cache import verified
+
+    path = object_path(digest)
+    with _lock():
+        item = load_index().objects.get(digest)
+    try:
+        intact = item is not None and path.stat().st_size == item.size
+        intact = intact and verified.verify(path, digest)
+    except FileNotFoundError:
+        intact = False
+
+    with _lock():
+        index = load_index()
+        if not intact:
+            if digest in index.objects:
+                logger.warning(
+                    f"Stored object {digest} is missing or corrupt; dropping it."
+                )
+                path.unlink(missing_ok=True)
+                forget(index, digest)
+                save_index(index)
+            return None
+        index.objects[digest].last_access = time.time()
+        save_index(index)
+    _in_use.add(digest)
+    logger.trace(f"Found {digest} in store.")
+    return path
+
+
+def put(
+    file: Path,
+    digest: str | None = None,
+    source: str | None = None,
+    name: str | None = None,
+) -> Path:
+    """
+    Moves a verified file into the store.
+
+    If an identical object is already stored the file is dropped instead.
+    Least recently used objects are evicted afterwards if the store exceeds
+    the `[cache] max_size` setting, except those used earlier in this run.
+
+    Parameters
+    ----------
+    file : Path
+        The file to store. It is moved, not copied.
+    digest : str, optional
+        The SHA-256 checksum of the file. Calculated if not provided.
+    source : str, optional
+        URL or source identifier the file was downloaded from.
+    name : str, optional
+        File name to remember for the object. Defaults to the name of file.
+
+    Returns
+    -------
+    Path
+        The path to the stored object.
+    """
+
+    from util.cache import verified
+
+    digest = digest or hash_file(file)
+    path = object_path(digest)
+    with _lock():
+        index = load_index()
+        if path.exists() and digest in index.objects:
+            logger.trace(f"{digest} is already stored; dropping {file}.")
+            file.unlink()
+        else:
+            make_dir(path.parent)
+            if shared_root():
+                # stored objects are immutable
+                os.chmod(file, 0o444)
+            try:
+                os.replace(file, path)
+            except OSError:
+                # across file systems, copy next to the object first so it
+                # only ever appears complete
+                tmp = path.with_name(f".{digest}.{os.getpid()}.tmp")
+                shutil.copy2(file, tmp)
+                os.replace(tmp, path)
+                file.unlink()
+            logger.trace(f"Stored {file.name} as {digest}.")
+        item = index.objects.get(digest) or StoreEntry(
+            size=path.stat().st_size, last_access=0, name=name or file.name
+        )
+        item.last_access = time.time()
+        if source:
+            if source not in item.sources:
+                item.sources.append(source)
+            index.sources[source] = digest
+        index.objects[digest] = item
+        _in_use.add(digest)
+        evict(index, keep=_in_use)
+        save_index(index)
+    verified.record(path, digest)
+    return path
+
+
+def link(digest: str, export: Path) -> Path:
+    """
+    Makes a stored object available at the given path through a symlink.
+
+    Parameters
+    ----------
+    digest : str
+        The SHA-256 checksum of the object.
+    export : Path
+        Where the object should be available.
+
+    Returns
+    -------
+    Path
+        The export path.
+    """
+
+    target = object_path(digest)
+    _in_use.add(digest)
+    if export.is_symlink() and export.readlink() == target:
+        return export
+    export.parent.mkdir(parents=True, exist_ok=True)
+    tmp = export.with_name(f".{export.name}.{threading.get_ident()}.link")
+    tmp.unlink(missing_ok=True)
+    tmp.symlink_to(target)
+    os.replace(tmp, export)
+    logger.trace(f"Linked {export} to {target}.")
+    return export
+
+
+def make_executable(export: Path) -> Path:
+    """
+    Makes a downloaded file executable for the current user.
+
+    Downloads are symlinks into the store, so changing the mode changes the
+    stored object itself. That only happens if it isn't executable already.
+    A shared object owned by another user is read-only, so the link is
+    replaced with a private executable copy instead.
+
+    Parameters
+    ----------
+    export : Path
+        The downloaded file, usually a link to a stored object.
+
+    Returns
+    -------
+    Path
+        The export path.
+    """
+
+    if os.access(export, os.X_OK):
+        return export
+    try:
+        export.chmod(export.stat().st_mode | stat.S_IXUSR | stat.S_IXGRP | stat.S_IXOTH)
+    except PermissionError:
+        tmp = export.with_name(f".{export.name}.{threading.get_ident()}.tmp")
+        shutil.copyfile(export, tmp)
+        tmp.chmod(0o755)
+        os.replace(tmp, export)
+        logger.trace(f"Replaced {export} with an executable copy.")
+    return export
+
+
+def forget(index: StoreIndex, digest: str):
+    """
+    Removes an object and the sources pointing at it from the index.
+    """
+
+    index.objects.pop(digest, None)
+    for source in [s for s, d in index.sources.items() if d == digest]:
+        del index.sources[source]
+
+
+def evict(
+    index: StoreIndex, max_size: int | None = None, keep: set[str] | None = None
+) -> int:
+    """
+    Removes least recently used objects until the store fits within max_size.
+
+    Parameters
+    ----------
+    index : StoreIndex
+        The loaded index. It is updated in place; the caller saves it.
+    max_size : int, optional
+        Maximum store size in bytes. Defaults to the `[cache] max_size` setting.
+    keep : set[str], optional
+        Checksums that must not be evicted.
+
+    Returns
+    -------
+    int
+        The number of bytes freed.
+    """
+
+    if max_size is None:
+        cache = var.settings.cache if var.settings else var.CacheSettings()
+        max_size = cache.max_size * 1024 * 1024
+    if not max_size:
+        return 0
+
+    freed = 0
+    total = index.total_size()
+    by_age = sorted(index.objects.items(), key=lambda item: item[1].last_access)
+    for digest, item in by_age:
+        if total <= max_size:
+            break
+        if keep and digest in keep:
+            continue
+        logger.debug(f"Evicting {item.name or digest} ({item.size} bytes) from store.")
+        object_path(digest).unlink(missing_ok=True)
+        forget(index, digest)
+        total -= item.size
+        freed += item.size
+    return freed
+
+
+def discard(digest: str):
+    """
+    Deletes a stored object and removes it from the index.
+    """
+
+    with _lock():
+        index = load_index()
+        object_path(digest).unlink(missing_ok=True)
+        forget(index, digest)
+        save_index(index)
+
+
+def trim(max_size: int | None = None) -> int:
+    """
+    Evicts least recently used objects until the store fits within max_size bytes.
+
+    Returns
+    -------
+    int
+        The number of bytes freed.
+    """
+
+    with _lock():
+        index = load_index()
+        freed = evict(index, max_size)
+        save_index(index)
+    return freed
@@ -0,0 +1,258 @@
+#!/usr/bin/env python3
+
+import atexit
+import json
+import os
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+
+from loguru import logger
+from util.cache.lock import locked
+from util.cache.store import cache_dir
+from util.checksum import hash_file
+
+index_file = cache_dir / "verified.json"
+lock_file = cache_dir / ".verified.lock"
+
+_lock = threading.Lock()
+_records: dict[str, "VerifiedFile"] | None = None
+_pending: dict[str, "VerifiedFile"] = {}
+
+
+@dataclass
+class VerifiedFile:
+    """
+    Stores the state of a file at the time its checksum was calculated.
+
+    Parameters
+    -----------
+    device : int
+        Device number of the file system holding the file.
+    size : int
+        Size of the file in bytes.
+    mtime_ns : int
+        Modification time of the file in nanoseconds.
+    inode : int
+        Inode number of the file.
+    sha256 : str, optional
+        The SHA-256 checksum of the file.
+    fast : str, optional
+        The checksum used for local comparisons, prefixed with its algorithm
+        (e.g. `blake2b-128:<digest>`), see util.checksum.fast_algorithm.
+    """
+
+    device: int
+    size: int
+    mtime_ns: int
+    inode: int
+    sha256: str | None = None
+    fast: str | None = None
+
+    @staticmethod
+    def from_stat(st: os.stat_result, sha256: str | None = None) -> "VerifiedFile":
+        return VerifiedFile(
+            device=st.st_dev,
+            size=st.st_size,
+            mtime_ns=st.st_mtime_ns,
+            inode=st.st_ino,
+            sha256=sha256,
+        )
+
+    @staticmethod
+    def from_dict(data: dict) -> "VerifiedFile":
+        return VerifiedFile(
+            # records from before the device was tracked never match
+            device=int(data.get("device", -1)),
+            size=int(data["size"]),
+            mtime_ns=int(data["mtime_ns"]),
+            inode=int(data["inode"]),
+            sha256=data.get("sha256"),
+            fast=data.get("fast"),
+        )
+
+    def to_dict(self) -> dict:
+        return {
+            "device": self.device,
+            "size": self.size,
+            "mtime_ns": self.mtime_ns,
+            "inode": self.inode,
+            "sha256": self.sha256,
+            "fast": self.fast,
+        }
+
+    def digest(self, algorithm: str) -> str | None:
+        """
+        Returns the recorded checksum of the given algorithm, if there is one.
+        """
+
+        if algorithm == "sha256":
+            return self.sha256
+        name, _, digest = (self.fast or "").partition(":")
+        return digest if name == algorithm else None
+
+    def set_digest(self, algorithm: str, digest: str):
+        if algorithm == "sha256":
+            self.sha256 = digest
+        else:
+            self.fast = f"{algorithm}:{digest}"
+
+    def matches(self, st: os.stat_result) -> bool:
+        return (self.device, self.inode, self.size, self.mtime_ns) == (
+            st.st_dev,
+            st.st_ino,
+            st.st_size,
+            st.st_mtime_ns,
+        )
+
+
+def read_records() -> dict[str, VerifiedFile]:
+    """
+    Reads the verified file index from disk, or returns an empty one if it
+    doesn't exist or is unreadable.
+    """
+
+    try:
+        with open(index_file) as f:
+            return {
+                path: VerifiedFile.from_dict(data)
+                for path, data in json.load(f).items()
+            }
+    except FileNotFoundError:
+        return {}
+    except (OSError, ValueError, TypeError, KeyError, AttributeError):
+        logger.warning(f"Verified file index at {index_file} is unreadable.")
+        return {}
+
+
+def load_records() -> dict[str, VerifiedFile]:
+    """
+    Loads the verified file index once per process.
+    """
+
+    global _records
+    if _records is None:
+        _records = read_records()
+    return _records
+
+
+def save_records():
+    """
+    Writes the checksums recorded since the last save to the index, dropping
+    files that no longer exist. The caller must hold _lock.
+
+    The index is read again and merged under a file lock, so concurrent
+    installs don't drop each other's records.
+    """
+
+    global _records
+    if not _pending:
+        return
+    with locked(lock_file):
+        records = read_records() | _pending
+        for path in [p for p in records if not os.path.exists(p)]:
+            del records[path]
+        tmp = index_file.with_name(f"{index_file.name}.{os.getpid()}.tmp")
+        with open(tmp, "w") as f:
+            json.dump({path: r.to_dict() for path, r in records.items()}, f, indent=2)
+        os.replace(tmp, index_file)
+    logger.trace(f"Saved {len(_pending)} checksums to {index_file}.")
+    _records = records
+    _pending.clear()
+
+
+def remember(key: str, entry: VerifiedFile):
+    """
+    Records an entry in memory. Entries are written by save(), at the latest
+    when the process exits. The caller must hold _lock.
+    """
+
+    load_records()[key] = entry
+    _pending[key] = entry
+
+
+def record(target: Path, sha256: str):
+    """
+    Records the checksum of a file whose content is already known, e.g. a
+    download that was hashed while it was written.
+    """
+
+    key = str(Path(target).resolve())
+    st = os.stat(key)
+    with _lock:
+        remember(key, VerifiedFile.from_stat(st, sha256))
+
+
+def checksum(target: Path, algorithm: str = "sha256") -> str:
+    """
+    Returns the SHA-256 checksum of a file, reusing the recorded one if the
+    file's device, inode, size and modification time haven't changed since.
+    Any change to them invalidates the record and the file is hashed again.
+
+    Parameters
+    ----------
+    target : Path
+        The file to get the checksum of.
+    algorithm : str, optional
+        The hash to use, see util.checksum.algorithms. Defaults to SHA-256.
+
+    Returns
+    -------
+    str
+        The checksum as a string.
+    """
+
+    key = str(Path(target).resolve())
+    st = os.stat(key)
+    with _lock:
+        known = load_records().get(key)
+    if known and known.matches(st):
+        digest = known.digest(algorithm)
+        if digest:
+            logger.trace(f"Using recorded checksum for {target}: {digest}")
+            return digest
+    else:
+        known = None
+
+    digest = hash_file(Path(key), algorithm)
+    with _lock:
+        record = known or VerifiedFile.from_stat(st)
+        record.set_digest(algorithm, digest)
+        remember(key, record)
+    return digest
+
+
+def save():
+    """
+    Writes the checksums recorded so far to the index. Batches of files,
+    e.g. util.checksum.get_checksums, save once at the end; anything else
+    is saved when the process exits.
+    """
+
+    with _lock:
+        save_records()
+
+
+atexit.register(save)
+
+
+def verify(target: Path, expected: str, size: int | None = None) -> bool:
+    """
+    Checks a file against an expected checksum, see checksum(). If the
+    expected size is known, a file of another size is rejected without hashing it.
+
+    Returns
+    -------
+    bool
+        True if the checksums match, False otherwise.
+    """
+
+    if size is not None and os.stat(target).st_size != size:
+        logger.trace(f"Size mismatch: {target} is not {size} bytes")
+        return False
+    digest = checksum(target)
+    if digest != expected:
+        logger.trace(f"Checksum mismatch: {digest} != {expected}")
+        return False
+    logger.trace(f"Checksum match: {digest} == {expected}")
+    return True
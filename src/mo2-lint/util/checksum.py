@@ -1,36 +1,166 @@
 #!/usr/bin/env python3
 
+import functools
 import hashlib
+import os
+import zlib
+from collections.abc import Iterable
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
 from loguru import logger
+from util import variables as var
 
 
-def get_checksum(target: Path) -> str:
+class CRC32:
+    """
+    Calculates a CRC-32 through the hashlib interface, to compare files with
+    the CRCs recorded in zip archives. Not suited to detect tampering.
     """
-    Calculates the SHA-256 checksum of the given file.
+
+    def __init__(self):
+        self.value = 0
+
+    def update(self, data: bytes):
+        self.value = zlib.crc32(data, self.value)
+
+    def digest(self) -> bytes:
+        return self.value.to_bytes(4, "big")
+
+    def hexdigest(self) -> str:
+        return f"{self.value:08x}"
+
+
+algorithms = {
+    "sha256": hashlib.sha256,
+    "blake2b-128": functools.partial(hashlib.blake2b, digest_size=16),
+    "crc32": CRC32,
+}
+
+# SHA-256 is kept for everything checked against the config files. Local
+# comparisons, e.g. of an installed file with the cached file it was copied
+# from, only need to notice changes, so they use BLAKE2b with a 128-bit
+# digest. It is fixed, so the fast checksums remembered in the verified file
+# index stay valid between runs.
+fast_algorithm = "blake2b-128"
+
+
+def hash_file(target: Path, algorithm: str = "sha256") -> str:
+    """
+    Calculates the checksum of the given file by reading all of it.
+
+    The file is read in large blocks by hashlib.file_digest, which hashes
+    without holding the GIL, so several files can be hashed in parallel.
 
     Parameters
     ----------
     target : Path
         The file path to calculate the checksum for.
+    algorithm : str, optional
+        The hash to use, one of algorithms. Defaults to SHA-256.
 
     Returns
     -------
     str
-        The SHA-256 checksum as a string.
+        The checksum as a string.
     """
 
-    logger.trace(f"Calculating checksum for file: {target}")
-    hash = hashlib.sha256()
+    logger.trace(f"Calculating {algorithm} checksum for file: {target}")
     with open(target, "rb") as file:
-        for byte_block in iter(lambda: file.read(4096), b""):
-            hash.update(byte_block)
-        digest = hash.hexdigest()
+        digest = hashlib.file_digest(file, algorithms[algorithm]).hexdigest()
     logger.trace(f"Calculated checksum for {target}: {digest}")
     return digest
 
 
+def get_checksum(target: Path) -> str:
+    """
+    Returns the SHA-256 checksum of the given file.
+
+    Checksums are remembered across runs in the verified file index, keyed by
+    the file's device, inode, size and modification time, so a file that
+    hasn't changed since it was last hashed is not read again. See
+    util.cache.verified.
+
+    Parameters
+    ----------
+    target : Path
+        The file path to get the checksum of.
+
+    Returns
+    -------
+    str
+        The SHA-256 checksum as a string.
+    """
+
+    from util.cache import verified
+
+    return verified.checksum(target)
+
+
+def get_checksums(
+    targets: Iterable[Path],
+    workers: int | None = None,
+    memo: bool = True,
+    fast: bool = False,
+    algorithm: str | None = None,
+) -> dict[Path, str]:
+    """
+    Returns the SHA-256 checksums of many files, hashing them concurrently.
+
+    Parameters
+    ----------
+    targets : Iterable[Path]
+        The files to get the checksums of.
+    workers : int, optional
+        Number of files to hash at once. Defaults to the number of CPUs.
+    memo : bool, optional
+        Whether to reuse and record checksums in the verified file index, see
+        get_checksum. Disable to re-read every file, e.g. to detect corruption.
+    fast : bool, optional
+        Use fast_algorithm instead of SHA-256. The checksums can only be
+        compared with each other, not with those in the config files.
+    algorithm : str, optional
+        The hash to use, one of algorithms, instead of SHA-256 or the fast
+        hash. Its checksums are not remembered, regardless of memo.
+
+    Returns
+    -------
+    dict[Path, str]
+        The checksum of each file.
+
+    Raises
+    ------
+    OSError
+        If a file can't be read.
+    """
+
+    targets = list(targets)
+    if not targets:
+        return {}
+    memo = memo and not algorithm
+    algorithm = algorithm or (fast_algorithm if fast else "sha256")
+    if memo:
+        from util.cache import verified
+
+        def hash(target: Path) -> str:
+            return verified.checksum(target, algorithm=algorithm)
+
+    else:
+
+        def hash(target: Path) -> str:
+            return hash_file(target, algorithm)
+
+    workers = min(workers or os.cpu_count() or 1, len(targets))
+    logger.debug(f"Hashing {len(targets)} files on {workers} threads.")
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            digests = list(pool.map(hash, targets))
+    finally:
+        if memo:
+            verified.save()
+    return dict(zip(targets, digests, strict=True))
+
+
 def compare_checksum(target_a: str | Path, target_b: str | Path) -> bool:
     """
     Compares the checksum of the target file against the source.
@@ -48,6 +178,14 @@ def compare_checksum(target_a: str | Path, target_b: str | Path) -> bool:
         True if the checksums match, False otherwise.
     """
 
+    if isinstance(target_a, Path) and isinstance(target_b, Path):
+        size_a, size_b = target_a.stat().st_size, target_b.stat().st_size
+        if size_a != size_b:
+            # files of different sizes can't match, so neither is read
+            logger.trace(
+                f"Size mismatch: {target_a} ({size_a}) != {target_b} ({size_b})"
+            )
+            return False
     checksum_a = target_a if isinstance(target_a, str) else get_checksum(target_a)
     checksum_b = target_b if isinstance(target_b, str) else get_checksum(target_b)
     check_pass = checksum_a == checksum_b
@@ -57,3 +195,53 @@ def compare_checksum(target_a: str | Path, target_b: str | Path) -> bool:
         logger.trace(f"Checksum mismatch: {checksum_a} != {checksum_b}")
 
     return check_pass
+
+
+def verify_manifest(
+    root: Path, manifest: dict[str, var.ManifestFile], workers: int | None = None
+) -> list[str]:
+    """
+    Checks extracted files against a manifest of their checksums and sizes.
+
+    Sizes are compared first, so missing, truncated or otherwise changed files
+    are found with a stat() call each. Only files of the expected size are
+    hashed, concurrently, see get_checksums.
+
+    Parameters
+    ----------
+    root : Path
+        The folder the manifest paths are relative to.
+    manifest : dict[str, ManifestFile]
+        Expected checksums and sizes, keyed by relative path.
+    workers : int, optional
+        Number of files to hash at once. Defaults to the number of CPUs.
+
+    Returns
+    -------
+    list[str]
+        The manifest paths that are missing or don't match.
+    """
+
+    failed = []
+    to_hash = {}
+    for name, expected in manifest.items():
+        path = root / name
+        try:
+            size = path.stat().st_size
+        except OSError:
+            logger.trace(f"{path} is missing.")
+            failed.append(name)
+            continue
+        if expected.size is not None and size != expected.size:
+            logger.trace(f"Size mismatch: {path} ({size} != {expected.size})")
+            failed.append(name)
+            continue
+        to_hash[path] = name
+    digests = get_checksums(to_hash, workers)
+    for path, name in to_hash.items():
+        if digests[path] != manifest[name].checksum:
+            logger.trace(
+                f"Checksum mismatch: {path} ({digests[path]} != {manifest[name].checksum})"
+            )
+            failed.append(name)
+    return failed
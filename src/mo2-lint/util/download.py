@@ -1,22 +1,709 @@
 #!/usr/bin/env python3
 
-import ssl
+import hashlib
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
 from pathlib import Path
 
-import certifi
 from loguru import logger
+from util import http, metrics, retry
+from util import variables as var
+from util.cache import singleflight, store, verified
 from util.checksum import compare_checksum
 from util.nexus.download_mod import nexus_download as nexus_dl
 
-ssl_context = ssl.create_default_context(cafile=certifi.where())
+chunk_size = 1024 * 1024
+min_segment_size = 8 * 1024 * 1024
+probe_timeout = 5
+
+
+@dataclass
+class PartialDownload:
+    """
+    Stores metadata for a download staged in a .part file, used to resume it.
+
+    Parameters
+    -----------
+    source : str, optional
+        Stable identifier of the download. Usually the URL, but can differ when
+        the actual URL changes between requests (e.g. Nexus CDN links).
+    url : str, optional
+        The URL the partial data was fetched from.
+    etag : str, optional
+        ETag returned by the server, used to validate resumed ranges.
+    last_modified : str, optional
+        Last-Modified header returned by the server, used if no ETag is available.
+    size : int, optional
+        Expected total size of the file in bytes.
+    checksum : str, optional
+        Expected SHA-256 checksum of the complete file.
+    segments : list[tuple[int, int]], optional
+        Byte ranges (inclusive) of a segmented download. None for sequential downloads.
+    completed : list[int], optional
+        Indices of the segments that have been fully written.
+    """
+
+    source: str | None = None
+    url: str | None = None
+    etag: str | None = None
+    last_modified: str | None = None
+    size: int | None = None
+    checksum: str | None = None
+    segments: list[tuple[int, int]] | None = None
+    completed: list[int] = field(default_factory=list)
+
+    @classmethod
+    def from_dict(cls, data: "dict[str, any] | PartialDownload") -> "PartialDownload":
+        if isinstance(data, cls):
+            return data
+        return cls(
+            source=data.get("source"),
+            url=data.get("url"),
+            etag=data.get("etag") or None,
+            last_modified=data.get("last_modified") or None,
+            size=data.get("size"),
+            checksum=data.get("checksum") or None,
+            segments=[tuple(segment) for segment in data.get("segments")]
+            if data.get("segments")
+            else None,
+            completed=list(data.get("completed") or []),
+        )
+
+    @classmethod
+    def to_dict(cls, data: "PartialDownload") -> dict[str, any]:
+        return {
+            "source": data.source,
+            "url": data.url,
+            "etag": data.etag,
+            "last_modified": data.last_modified,
+            "size": data.size,
+            "checksum": data.checksum,
+            "segments": [list(segment) for segment in data.segments]
+            if data.segments
+            else None,
+            "completed": sorted(data.completed),
+        }
+
+
+def stream(
+    response,
+    out_file,
+    expected_size: int | None = None,
+    hash=None,
+    progress: metrics.Progress | None = None,
+) -> str:
+    """
+    Streams a response body to a file in fixed-size chunks, hashing as it goes.
+
+    Parameters
+    ----------
+    response
+        The open response to read from.
+    out_file
+        The binary file object to write to.
+    expected_size : int, optional
+        The size announced by the server (Content-Length). If provided, the
+        transfer is aborted as soon as more bytes arrive, and rejected if fewer arrive.
+    hash : optional
+        A hashlib object already fed with any previously downloaded data.
+        If None, a new SHA-256 hash is started.
+    progress : Progress, optional
+        Tracks the transfer and applies the global bandwidth limit.
+
+    Returns
+    -------
+    str
+        The SHA-256 checksum of all data fed to the hash.
+
+    Raises
+    ------
+    ValueError
+        If the number of bytes received does not match expected_size.
+    """
+
+    hash = hash or hashlib.sha256()
+    received = 0
+    chunks = response.iter_content(chunk_size)
+    for chunk in progress.chunks(chunks) if progress else chunks:
+        received += len(chunk)
+        if expected_size is not None and received > expected_size:
+            raise ValueError(
+                f"Received more data than announced ({received} > {expected_size} bytes)."
+            )
+        hash.update(chunk)
+        out_file.write(chunk)
+    if expected_size is not None and received < expected_size:
+        raise ValueError(f"Transfer ended early ({received} < {expected_size} bytes).")
+    logger.trace(f"Streamed {received} bytes to {out_file.name}")
+    return hash.hexdigest()
+
+
+def part_paths(export: Path) -> tuple[Path, Path]:
+    """
+    Returns the staging file and metadata file paths for a download target.
+    """
+
+    return (
+        export.with_name(f"{export.name}.part"),
+        export.with_name(f"{export.name}.part.json"),
+    )
+
+
+def discard_part(export: Path):
+    """
+    Removes any staged data and metadata for a download target.
+    """
+
+    for path in part_paths(export):
+        path.unlink(missing_ok=True)
+
+
+def read_part(
+    export: Path, source: str, checksum: str | None, size: int | None = None
+) -> tuple[int, PartialDownload | None]:
+    """
+    Checks whether a staged download can be resumed.
+
+    Parameters
+    ----------
+    export : Path
+        The final path of the download.
+    source : str
+        Stable identifier of the download.
+    checksum : str, optional
+        Expected SHA-256 checksum of the complete file.
+    size : int, optional
+        Expected size of the complete file in bytes.
+
+    Returns
+    -------
+    tuple[int, PartialDownload | None]
+        The number of bytes already staged, and the stored metadata.
+        Returns (0, None) and discards the staged data if it cannot be resumed.
+    """
+
+    part, meta_path = part_paths(export)
+    if not (part.exists() and meta_path.exists()):
+        discard_part(export)
+        return 0, None
+    try:
+        meta = PartialDownload.from_dict(json.loads(meta_path.read_text()))
+    except Exception:
+        logger.trace(f"Unreadable partial download metadata at {meta_path}")
+        discard_part(export)
+        return 0, None
+    if meta.source != source or meta.checksum != checksum:
+        logger.trace(
+            f"Partial download at {part} belongs to a different source or checksum. Discarding."
+        )
+        discard_part(export)
+        return 0, None
+    if size is not None and meta.size not in (None, size):
+        logger.trace(f"Partial download at {part} has the wrong size. Discarding.")
+        discard_part(export)
+        return 0, None
+    offset = part.stat().st_size
+    if meta.size is not None and offset > meta.size:
+        discard_part(export)
+        return 0, None
+    return offset, meta
+
+
+def write_part(export: Path, meta: PartialDownload):
+    """
+    Writes the metadata for a staged download.
+    """
+
+    _, meta_path = part_paths(export)
+    meta_path.write_text(json.dumps(PartialDownload.to_dict(meta), indent=2))
+
+
+def hash_part(part: Path):
+    """
+    Feeds already staged data into a new SHA-256 hash, so a resumed transfer
+    can continue hashing where it left off.
+    """
+
+    with open(part, "rb") as file:
+        return hashlib.file_digest(file, "sha256")
+
+
+class SizeMismatchError(retry.PermanentError, ValueError):
+    """
+    Raised when a server announces a different size than the config files
+    expect. Retrying can't fix it, but another mirror may serve the right file.
+    """
+
+
+def check_size(name: str, size: int | None, expected: int | None):
+    """
+    Rejects a download whose announced size differs from the expected one,
+    before any of it is transferred.
+
+    Raises
+    ------
+    SizeMismatchError
+        If both sizes are known and differ.
+    """
+
+    if size is not None and expected is not None and size != expected:
+        raise SizeMismatchError(
+            f"Size mismatch for {name}: the server announced {size} bytes, expected {expected}."
+        )
+
+
+def finish_part(export: Path, digest: str, checksum: str | None) -> str:
+    """
+    Verifies a completely staged download and atomically moves it into place.
+
+    Raises
+    ------
+    ValueError
+        If the checksum does not match. The staged data is discarded.
+    """
+
+    part, meta_path = part_paths(export)
+    if checksum and not compare_checksum(digest, checksum):
+        discard_part(export)
+        raise ValueError(f"Checksum mismatch for {export.name}: {digest} != {checksum}")
+    os.replace(part, export)
+    meta_path.unlink(missing_ok=True)
+    return digest
+
+
+def fetch(
+    url: str,
+    export: Path,
+    checksum: str | None = None,
+    headers: dict | None = None,
+    source: str | None = None,
+    segments: int | None = None,
+    size: int | None = None,
+) -> str:
+    """
+    Downloads a URL to export, staging it in a .part file.
+
+    An existing .part file for the same source and checksum is resumed with an
+    HTTP Range request. The file is only moved to export once it is complete
+    and, if a checksum is given, verified.
+
+    If segments is greater than 1 and the server supports byte ranges, the
+    file is split into that many ranges which are fetched in parallel. See fetch_segmented.
+
+    Parameters
+    ----------
+    url : str
+        The URL to download.
+    export : Path
+        The final path of the downloaded file.
+    checksum : str, optional
+        The expected SHA-256 checksum of the file.
+    headers : dict, optional
+        Additional request headers.
+    source : str, optional
+        Stable identifier of the download, used to match staged data. Defaults to url.
+    segments : int, optional
+        Number of parallel connections to use for large files.
+    size : int, optional
+        The expected size of the file in bytes. A response of another size
+        is rejected before its body is read.
+
+    Returns
+    -------
+    str
+        The SHA-256 checksum of the downloaded file.
+
+    Raises
+    ------
+    Exception
+        If the download fails or the checksum or size does not match. Staged data is
+        kept on transfer errors so that the next call can resume it.
+    """
+
+    source = source or url
+    part, _ = part_paths(export)
+    offset, meta = read_part(export, source, checksum, size)
+    if meta and meta.url != url and checksum:
+        # staged data from another mirror can be continued; the checksum verifies the result
+        logger.debug(f"Continuing {export.name} from {url} (was {meta.url}).")
+        meta.url, meta.etag, meta.last_modified = url, None, None
+
+    if meta and meta.segments:
+        return fetch_segmented(url, export, meta, headers, segments)
+    if not offset and segments and segments > 1:
+        total, etag, last_modified = probe(url, headers)
+        check_size(export.name, total, size)
+        if total is not None and total >= min_segment_size * 2:
+            count = min(segments, total // min_segment_size)
+            meta = PartialDownload(
+                source=source,
+                url=url,
+                etag=etag,
+                last_modified=last_modified,
+                size=total,
+                checksum=checksum,
+                segments=split_ranges(total, count),
+            )
+            return fetch_segmented(url, export, meta, headers, segments)
+
+    if meta and meta.size is not None and offset == meta.size:
+        logger.trace(f"{part} is already complete; verifying staged data.")
+        return finish_part(export, hash_part(part).hexdigest(), checksum)
+
+    headers = dict(headers or {})
+    if offset:
+        logger.debug(f"Resuming download of {export.name} from byte {offset}.")
+        headers["Range"] = f"bytes={offset}-"
+        if meta.etag or meta.last_modified:
+            headers["If-Range"] = meta.etag or meta.last_modified
+
+    progress = metrics.Progress(export.name, url, source)
+    try:
+        started = time.monotonic()
+        with http.get(url, headers=headers, stream=True) as response:
+            progress.connected(time.monotonic() - started)
+            if response.status_code == 416:
+                logger.trace(
+                    f"Server rejected resume range for {export.name}. Restarting."
+                )
+                discard_part(export)
+            response.raise_for_status()
+
+            length = response.headers.get("Content-Length")
+            length = int(length) if length else None
+            if offset and response.status_code == 206:
+                hash = hash_part(part)
+                mode = "ab"
+            else:
+                if offset:
+                    logger.trace(
+                        f"Server does not support resuming {export.name}. Restarting from zero."
+                    )
+                offset = 0
+                hash = hashlib.sha256()
+                mode = "wb"
+            if length is None and size is not None:
+                length = size - offset
+            check_size(
+                export.name, offset + length if length is not None else None, size
+            )
+            progress.offset = offset
+            progress.total = offset + length if length is not None else None
+            write_part(
+                export,
+                PartialDownload(
+                    source=source,
+                    url=url,
+                    etag=response.headers.get("ETag"),
+                    last_modified=response.headers.get("Last-Modified"),
+                    size=progress.total,
+                    checksum=checksum,
+                ),
+            )
+            with open(part, mode) as out_file:
+                digest = stream(response, out_file, length, hash, progress)
+    except Exception:
+        progress.finish(ok=False)
+        raise
+    progress.finish()
+
+    return finish_part(export, digest, checksum)
+
+
+def probe(url: str, headers: dict | None = None) -> tuple[int | None, str, str]:
+    """
+    Sends a HEAD request to find out whether a URL can be fetched in byte ranges.
+
+    Returns
+    -------
+    tuple[int | None, str | None, str | None]
+        The size of the file (None if unknown or ranges are not supported),
+        and its ETag and Last-Modified headers.
+    """
+
+    # ask for the size of the unencoded body, which the segments are fetched
+    # as, see http.get; a compressed length would split it wrongly
+    headers = {"Accept-Encoding": "identity"} | dict(headers or {})
+    try:
+        with http.head(url, headers=headers) as response:
+            response.raise_for_status()
+            length = response.headers.get("Content-Length")
+            ranges = response.headers.get("Accept-Ranges", "").lower()
+            etag = response.headers.get("ETag")
+            last_modified = response.headers.get("Last-Modified")
+    except Exception:
+        logger.trace(f"HEAD request to {url} failed; not segmenting download.")
+        return None, None, None
+    if ranges != "bytes" or not length:
+        logger.trace(f"{url} does not support byte ranges; not segmenting download.")
+        return None, etag, last_modified
+    return int(length), etag, last_modified
+
+
+def split_ranges(size: int, count: int) -> list[tuple[int, int]]:
+    """
+    Splits a file of the given size into count inclusive byte ranges.
+    """
+
+    step = -(-size // count)
+    return [(start, min(start + step, size) - 1) for start in range(0, size, step)]
+
+
+def preallocate(path: Path, size: int):
+    """
+    Creates (or extends) a file to the given size, reserving the disk space up front.
+    """
+
+    with open(path, "ab") as file:
+        try:
+            os.posix_fallocate(file.fileno(), 0, size)
+        except (AttributeError, OSError):
+            file.truncate(size)
+
+
+def fetch_segment(
+    url: str,
+    part: Path,
+    segment: tuple[int, int],
+    meta: PartialDownload,
+    headers: dict | None = None,
+    progress: metrics.Progress | None = None,
+):
+    """
+    Fetches one byte range of a segmented download and writes it in place.
+
+    Returns
+    -------
+    bool
+        True if the range was written, False if the server answered with the
+        whole file instead (e.g. because it changed since the download started).
+
+    Raises
+    ------
+    ValueError
+        If the server sends more or less data than requested.
+    """
+
+    start, end = segment
+    headers = dict(headers or {})
+    headers["Range"] = f"bytes={start}-{end}"
+    if meta.etag or meta.last_modified:
+        headers["If-Range"] = meta.etag or meta.last_modified
+    started = time.monotonic()
+    with http.get(url, headers=headers, stream=True) as response:
+        if progress:
+            progress.connected(time.monotonic() - started)
+        response.raise_for_status()
+        if response.status_code != 206:
+            logger.trace(
+                f"Server ignored range request for bytes {start}-{end} (HTTP {response.status_code})."
+            )
+            return False
+        received = 0
+        expected = end - start + 1
+        with open(part, "r+b") as out_file:
+            out_file.seek(start)
+            chunks = response.iter_content(chunk_size)
+            for chunk in progress.chunks(chunks) if progress else chunks:
+                received += len(chunk)
+                if received > expected:
+                    raise ValueError(
+                        f"Received more data than requested for bytes {start}-{end}."
+                    )
+                out_file.write(chunk)
+    if received < expected:
+        raise ValueError(
+            f"Segment {start}-{end} ended early ({received} < {expected} bytes)."
+        )
+    return True
+
+
+def fetch_segmented(
+    url: str,
+    export: Path,
+    meta: PartialDownload,
+    headers: dict | None = None,
+    connections: int | None = None,
+) -> str:
+    """
+    Downloads a file as several byte ranges fetched in parallel.
+
+    The .part file is preallocated to its full size and each segment is written
+    at its own offset. Completed segments are recorded in the part metadata so
+    that only missing segments are fetched again after a failure. Since the
+    segments arrive out of order, the file is hashed once after the last one completes.
+
+    Parameters
+    ----------
+    url : str
+        The URL to download.
+    export : Path
+        The final path of the downloaded file.
+    meta : PartialDownload
+        The staging metadata, including the planned segments.
+    headers : dict, optional
+        Additional request headers.
+    connections : int, optional
+        Maximum number of parallel connections. Defaults to the number of segments.
+
+    Returns
+    -------
+    str
+        The SHA-256 checksum of the downloaded file.
+    """
+
+    part, _ = part_paths(export)
+    lock = threading.Lock()
+    pending = [i for i in range(len(meta.segments)) if i not in meta.completed]
+    logger.debug(
+        f"Downloading {export.name} in {len(meta.segments)} segments ({len(pending)} remaining)."
+    )
+    preallocate(part, meta.size)
+    write_part(export, meta)
+    progress = metrics.Progress(
+        export.name,
+        url,
+        meta.source,
+        total=meta.size,
+        offset=sum(
+            end - start + 1 for start, end in (meta.segments[i] for i in meta.completed)
+        ),
+        segments=len(meta.segments),
+    )
+
+    def run(index: int) -> bool:
+        if not fetch_segment(url, part, meta.segments[index], meta, headers, progress):
+            return False
+        with lock:
+            meta.completed.append(index)
+            write_part(export, meta)
+        return True
+
+    try:
+        with ThreadPoolExecutor(
+            max_workers=min(connections or len(pending), len(pending)) or 1
+        ) as pool:
+            futures = [pool.submit(run, index) for index in pending]
+            for future in futures:
+                if future.exception():
+                    raise future.exception()
+            if not all(future.result() for future in futures):
+                discard_part(export)
+                raise ValueError(
+                    f"Server no longer serves byte ranges for {export.name}. Restarting download."
+                )
+    except Exception:
+        progress.finish(ok=False)
+        raise
+    progress.finish()
+
+    return finish_part(export, hash_part(part).hexdigest(), meta.checksum)
+
+
+def mirror_urls(
+    url: str, filename: str, checksum: str | None, mirrors: list[str] | None = None
+) -> list[str]:
+    """
+    Lists every URL a file can be downloaded from.
+
+    Mirrors configured with the `[download] mirrors` setting are only included
+    for files with a known checksum, since they are not vetted by the config files.
+
+    Parameters
+    ----------
+    url : str
+        The primary URL of the file.
+    filename : str
+        The name of the file, appended to the base URL of configured mirrors.
+    checksum : str, optional
+        The expected checksum of the file.
+    mirrors : list[str], optional
+        Alternative URLs for the file, as given in the config files.
+
+    Returns
+    -------
+    list[str]
+        The candidate URLs without duplicates, primary URL first.
+    """
+
+    urls = [url, *(mirrors or ())]
+    if checksum and var.settings:
+        urls += [
+            f"{base.rstrip('/')}/{filename}" for base in var.settings.download.mirrors
+        ]
+    return list(dict.fromkeys(urls))
+
+
+def rank_sources(urls: list[str], headers: dict | None = None) -> list[str]:
+    """
+    Orders candidate URLs for a file by how quickly they answer a HEAD request.
+
+    All candidates are probed in parallel. Unreachable candidates are kept at
+    the end of the list as a last resort. A single candidate is returned without probing.
+
+    Returns
+    -------
+    list[str]
+        The candidate URLs, fastest first.
+    """
+
+    if len(urls) < 2:
+        return urls
+
+    def measure(url: str) -> float | None:
+        started = time.monotonic()
+        try:
+            with http.head(url, headers=headers, timeout=probe_timeout) as response:
+                response.raise_for_status()
+        except Exception:
+            logger.trace(f"Mirror {url} did not answer.")
+            return None
+        return time.monotonic() - started
+
+    with ThreadPoolExecutor(max_workers=len(urls)) as pool:
+        latencies = list(pool.map(measure, urls))
+    ranked = sorted(
+        (latency, index)
+        for index, latency in enumerate(latencies)
+        if latency is not None
+    )
+    result = [urls[index] for _, index in ranked]
+    result += [url for url, latency in zip(urls, latencies) if latency is None]
+    logger.debug(
+        "Mirror latencies: "
+        + ", ".join(
+            f"{url} ({f'{latency * 1000:.0f} ms' if latency is not None else 'unreachable'})"
+            for url, latency in zip(urls, latencies)
+        )
+    )
+    return result
 
 
 def download(
-    url: str, dest: Path, filename: str | None = None, checksum: str | None = None
+    url: str,
+    dest: Path,
+    filename: str | None = None,
+    checksum: str | None = None,
+    segments: int | None = None,
+    mirrors: list[str] | None = None,
+    size: int | None = None,
 ) -> Path:
     """
     Downloads a file from the specified URL to the destination directory.
 
+    Downloaded files are kept in the content store and linked into dest, so a
+    file that is already stored under the same checksum (or was previously
+    downloaded from the same URL) is not downloaded again. The file is staged as
+    `<filename>.part` until it is complete and verified, and interrupted
+    transfers are resumed on the next attempt. Failed attempts are retried
+    according to the `[download.retry]` policy, see util.retry. Concurrent
+    downloads of the same file, in this or another process, wait for the
+    first one and then reuse the stored file, see util.cache.singleflight.
+
     Parameters
     ----------
     url : str
@@ -27,6 +714,13 @@ def download(
         The name to save the file as. If None, uses the name from the URL.
     checksum : str, optional
         The expected checksum of the file for verification. If None, no verification is performed.
+    segments : int, optional
+        Number of parallel connections to split large files across.
+    mirrors : list[str], optional
+        Alternative URLs serving the same file. See mirror_urls and rank_sources.
+    size : int, optional
+        The expected size of the file in bytes. Existing files and responses
+        of another size are rejected without hashing or downloading them.
 
     Returns
     -------
@@ -34,49 +728,58 @@ def download(
         The path to the downloaded file.
     """
 
-    attempts = 3
     dest.mkdir(parents=True, exist_ok=True)
     filename = filename or url.split("/")[-1]
     export = dest / filename
 
-    logger.debug(f"Attempting to download {filename} from {url}.")
-    if export.exists():
-        logger.trace(
-            f"{filename} already exists at destination: {export}; skipping download."
-        )
-        return export
+    with singleflight.flight(f"download:{checksum or url}", filename):
+        logger.debug(f"Attempting to download {filename} from {url}.")
+        digest = checksum or store.lookup(url)
+        if digest and store.get(digest):
+            logger.trace(f"{filename} found in store; skipping download.")
+            return store.link(digest, export)
 
-    for i in range(attempts):
-        try:
-            from urllib.request import Request, urlopen
-
-            req = Request(url)
-            with (
-                urlopen(req, context=ssl_context) as response,
-                open(export, "wb") as out_file,
-            ):
-                out_file.write(response.read())
-            if export.exists() and checksum:
-                if compare_checksum(export, checksum):
-                    logger.trace(
-                        f"Successfully downloaded and verified {filename} from {url} on attempt {i + 1}."
-                    )
-                    return export
-                else:
-                    logger.trace(
-                        f"Checksum mismatch for {filename} downloaded from {url} on attempt {i + 1}. Retrying."
-                    )
-                    export.unlink(missing_ok=True)
-            elif export.exists():
+        if export.exists() and not export.is_symlink():
+            if not checksum or verified.verify(export, checksum, size):
                 logger.trace(
-                    f"Successfully downloaded {filename} from {url} on attempt {i + 1}."
+                    f"{filename} already exists at destination: {export}; moving it to the store."
                 )
-                return export
-        except Exception:
-            logger.exception(
-                f"Failed to download {filename} from {url} on attempt {i + 1}."
+                store.put(export, checksum, source=url)
+                return store.link(store.lookup(url), export)
+            logger.warning(
+                f"Existing {filename} at {export} does not match the expected checksum. Downloading again."
             )
-    return None
+        export.unlink(missing_ok=True)
+
+        sources = rank_sources(mirror_urls(url, filename, checksum, mirrors))
+
+        def attempt() -> str:
+            errors = []
+            for source in sources:
+                try:
+                    return retry.guarded(
+                        source,
+                        fetch,
+                        source,
+                        export,
+                        checksum,
+                        source=url,
+                        segments=segments,
+                        size=size,
+                    )
+                except Exception as e:
+                    logger.debug(f"Failed to download {filename} from {source}: {e}")
+                    errors.append(e)
+            raise next((e for e in errors if retry.retryable(e)), errors[-1])
+
+        try:
+            digest = retry.call(filename, attempt)
+        except Exception:
+            logger.exception(f"Failed to download {filename} from {url}.")
+            return None
+        logger.trace(f"Successfully downloaded {filename}.")
+        store.put(export, digest, source=url)
+        return store.link(digest, export)
 
 
 def download_nexus(
@@ -90,6 +793,10 @@ def download_nexus(
     """
     Downloads a file from Nexus Mods.
 
+    Like download(), files are kept in the content store. Stored files are
+    looked up by checksum or by their game, mod and file ID, so a stored file
+    is reused without contacting the Nexus API.
+
     Parameters
     ----------
     game : str
@@ -112,32 +819,33 @@ def download_nexus(
     """
 
     dest.mkdir(parents=True, exist_ok=True)
-    logger.debug(
-        f"Attempting to download file_id {file_id} from mod_id {mod_id} for game {game} from Nexus Mods."
-    )
-    try:
-        filename = nexus_dl(game, str(mod_id), str(file_id), dest, filename or None)
-        if not filename:
-            return None
-        export = dest / filename
-        if export.exists() and checksum:
-            if compare_checksum(export, checksum):
-                logger.trace(
-                    f"Successfully downloaded and verified file_id {file_id} from mod_id {mod_id} for game {game} from Nexus Mods."
-                )
-                return export
-            else:
+    source = f"nexus:{game}/{mod_id}/{file_id}"
+    with singleflight.flight(f"download:{checksum or source}", filename or source):
+        digest = checksum or store.lookup(source)
+        if digest and store.get(digest):
+            name = filename or store.entry(digest).name
+            logger.trace(f"{name} found in store; skipping Nexus download.")
+            return store.link(digest, dest / name)
+
+        logger.debug(
+            f"Attempting to download file_id {file_id} from mod_id {mod_id} for game {game} from Nexus Mods."
+        )
+        try:
+            filename = nexus_dl(
+                game, str(mod_id), str(file_id), dest, filename or None, checksum
+            )
+            if not filename:
+                return None
+            export = dest / filename
+            if export.exists():
                 logger.trace(
-                    f"Checksum mismatch for file_id {file_id} from mod_id {mod_id} for game {game} from Nexus Mods. Retrying."
+                    f"Successfully downloaded file_id {file_id} from mod_id {mod_id} for game {game} from Nexus Mods."
                 )
-                export.unlink(missing_ok=True)
-        elif export.exists():
-            logger.trace(
-                f"Successfully downloaded file_id {file_id} from mod_id {mod_id} for game {game} from Nexus Mods."
+                if not export.is_symlink():
+                    store.put(export, checksum, source=source)
+                return store.link(store.lookup(source), export)
+        except Exception:
+            logger.exception(
+                f"Failed to download file_id {file_id} from mod_id {mod_id} for game {game} from Nexus Mods."
             )
-            return export
-    except Exception:
-        logger.exception(
-            f"Failed to download file_id {file_id} from mod_id {mod_id} for game {game} from Nexus Mods."
-        )
-    return None
+        return None
@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+
+import email.utils
+import os
+import re
+import threading
+from pathlib import Path
+from urllib.parse import unquote, urlsplit
+
+import certifi
+import requests
+from loguru import logger
+from requests.adapters import BaseAdapter, HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from util import variables as var
+
+pool_size = 32
+timeout = (15, 60)
+
+_session: requests.Session | None = None
+_lock = threading.Lock()
+
+
+class RangeReader:
+    """
+    File-like object returning at most length bytes of a file, starting at offset.
+    """
+
+    def __init__(self, path: Path, offset: int, length: int):
+        self.file = open(path, "rb")  # noqa: SIM115 - closed with the response
+        self.file.seek(offset)
+        self.remaining = length
+
+    def read(self, size: int = -1, **_) -> bytes:
+        if size is None or size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.file.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def close(self):
+        self.file.close()
+
+    def release_conn(self):
+        self.close()
+
+
+class FileAdapter(BaseAdapter):
+    """
+    Serves file:// URLs through the shared session, so local and network-share
+    mirrors can be used like any HTTP mirror. Supports HEAD and single byte ranges.
+    """
+
+    def send(self, request, **kwargs):
+        response = requests.Response()
+        response.request = request
+        response.url = request.url
+        response.headers = CaseInsensitiveDict()
+        path = Path(unquote(urlsplit(request.url).path))
+        try:
+            st = path.stat()
+        except OSError:
+            response.status_code = 404
+            response.reason = "Not Found"
+            response.raw = RangeReader(os.devnull, 0, 0)
+            return response
+
+        size = st.st_size
+        start, end = 0, size - 1
+        response.status_code = 200
+        match = re.fullmatch(
+            r"bytes=(\d+)-(\d*)", request.headers.get("Range", "").strip()
+        )
+        validator = request.headers.get("If-Range")
+        etag = f'"{st.st_mtime_ns:x}-{size:x}"'
+        if match and (not validator or validator == etag):
+            start = int(match.group(1))
+            end = min(int(match.group(2)), size - 1) if match.group(2) else size - 1
+            if start >= size:
+                response.status_code = 416
+                response.reason = "Range Not Satisfiable"
+                response.raw = RangeReader(os.devnull, 0, 0)
+                return response
+            response.status_code = 206
+            response.headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+
+        length = end - start + 1 if request.method != "HEAD" else 0
+        response.headers["Content-Length"] = str(end - start + 1)
+        response.headers["Accept-Ranges"] = "bytes"
+        response.headers["ETag"] = etag
+        response.headers["Last-Modified"] = email.utils.formatdate(
+            st.st_mtime, usegmt=True
+        )
+        response.raw = RangeReader(path, start, length)
+        return response
+
+    def close(self):
+        pass
+
+
+def session() -> requests.Session:
+    """
+    Returns the HTTP session shared by every request the installer makes.
+
+    The session is created on first use. It keeps connections alive per host,
+    so repeated requests to GitHub, plugin manifests, Nexus Mods and download
+    mirrors reuse their TCP and TLS connections instead of opening new ones.
+
+    Returns
+    -------
+    requests.Session
+        The shared session.
+    """
+
+    global _session
+    with _lock:
+        if _session is None:
+            logger.trace("Creating shared HTTP session")
+            _session = requests.Session()
+            _session.verify = certifi.where()
+            _session.headers["User-Agent"] = f"mo2-lint/{var.version}"
+            adapter = HTTPAdapter(pool_connections=8, pool_maxsize=pool_size)
+            _session.mount("https://", adapter)
+            _session.mount("http://", adapter)
+            _session.mount("file://", FileAdapter())
+    return _session
+
+
+def get(url: str, headers: dict | None = None, stream: bool = False, **kwargs):
+    """
+    Sends a GET request through the shared session.
+
+    Parameters
+    ----------
+    url : str
+        The URL to request.
+    headers : dict, optional
+        Additional request headers.
+    stream : bool, optional
+        Whether to defer downloading the body. When set, the body is requested
+        without content encoding so it can be written to disk as-is.
+    **kwargs
+        Passed on to requests.Session.get.
+
+    Returns
+    -------
+    requests.Response
+        The response.
+    """
+
+    headers = dict(headers or {})
+    if stream:
+        headers.setdefault("Accept-Encoding", "identity")
+    kwargs.setdefault("timeout", timeout)
+    logger.trace(f"GET {url}")
+    return session().get(url, headers=headers, stream=stream, **kwargs)
+
+
+def head(url: str, headers: dict | None = None, **kwargs):
+    """
+    Sends a HEAD request through the shared session, following redirects.
+    """
+
+    kwargs.setdefault("timeout", timeout)
+    kwargs.setdefault("allow_redirects", True)
+    logger.trace(f"HEAD {url}")
+    return session().head(url, headers=dict(headers or {}), **kwargs)
@@ -17,6 +17,17 @@ help_list = """List existing Mod Organizer 2 instances."""
 help_pin = """Pin the Mod Organizer 2 installation in the specified directory, preventing updates."""
 help_unpin = """Unpin the Mod Organizer 2 installation in the specified directory, allowing updates."""
 help_update = """Update the Mod Organizer 2 installation in the specified directory, as well as the launch option for the game."""
+help_prefetch = """Download and verify everything needed to install the given games, without creating instances.
+\nGAMES                           Games to prefetch resources for.
+\n                                Options: [{list}]"""
+help_verify = """Check the installed files of Mod Organizer 2 instances for missing or modified files.
+\nChecks Mod Organizer 2, the redirector, script extender files and plugin files."""
+help_cache = """Inspect and clean up the download cache."""
+help_cache_stats = """Show the size of the download cache by category."""
+help_cache_verify = """Re-hash cached archives and extracted files against their checksums.
+\nCorrupt archives are removed, so they are downloaded again on next use."""
+help_cache_gc = """Remove cached archives and extracted folders that no current config or instance references.
+\nPartial downloads older than a day are removed as well."""
 
 
 def list_instances(instance_list: list) -> list:
@@ -0,0 +1,236 @@
+#!/usr/bin/env python3
+
+import json
+import os
+import threading
+import time
+from urllib.parse import urlsplit
+
+from loguru import logger
+from util import variables as var
+from util.cache.store import cache_dir
+
+metrics_file = cache_dir / "metrics.jsonl"
+# size at which the metrics file is rotated; one older file is kept
+metrics_limit = 1024 * 1024
+log_interval = 2.0
+
+_lock = threading.Lock()
+_throttle: "Throttle | None" = None
+
+
+def format_size(size: float) -> str:
+    """
+    Formats a byte count as a human readable string.
+    """
+
+    for unit in ("B", "KiB", "MiB"):
+        if size < 1024:
+            return f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.2f} GiB"
+
+
+class Throttle:
+    """
+    Token bucket shared by every transfer, limiting their combined bandwidth.
+
+    Parameters
+    ----------
+    rate : int
+        Maximum rate in bytes per second. 0 disables the limit.
+    """
+
+    def __init__(self, rate: int):
+        self.rate = rate
+        self.tokens = float(rate)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def consume(self, size: int):
+        """
+        Takes size bytes from the bucket, sleeping until the caller is within the limit.
+        """
+
+        if not self.rate:
+            return
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.rate, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= size
+            wait = -self.tokens / self.rate if self.tokens < 0 else 0
+        if wait:
+            time.sleep(wait)
+
+
+def throttle() -> Throttle:
+    """
+    Returns the global throttle configured by the `[download] bandwidth_limit` setting.
+    """
+
+    global _throttle
+    with _lock:
+        if _throttle is None:
+            download = var.settings.download if var.settings else var.DownloadSettings()
+            _throttle = Throttle(download.bandwidth_limit * 1024)
+            if download.bandwidth_limit:
+                logger.debug(
+                    f"Limiting download bandwidth to {download.bandwidth_limit} KiB/s"
+                )
+    return _throttle
+
+
+class Progress:
+    """
+    Tracks the transfer of a single artifact, logs its progress and records
+    its metrics once it finishes.
+
+    Time spent waiting for data (network) and time spent handling it (writing
+    and hashing) are measured separately, so slow servers can be told apart
+    from slow disks. Segmented downloads share a single Progress between threads.
+
+    Parameters
+    ----------
+    name : str
+        Name of the artifact, used in log messages.
+    url : str
+        The URL the artifact is fetched from. Only its host and path are recorded.
+    source : str, optional
+        Stable identifier of the artifact, if it differs from the URL (e.g. Nexus downloads).
+    total : int, optional
+        Expected size in bytes, if known.
+    offset : int, optional
+        Bytes already present from an earlier, interrupted transfer.
+    segments : int, optional
+        Number of parallel segments the artifact is fetched in.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        url: str,
+        source: str | None = None,
+        total: int | None = None,
+        offset: int = 0,
+        segments: int = 1,
+    ):
+        self.name = name
+        self.url = urlsplit(url)._replace(query="", fragment="").geturl()
+        self.host = urlsplit(url).hostname
+        self.source = source or self.url
+        self.total = total
+        self.offset = offset
+        self.segments = segments
+        self.received = 0
+        self.latency: float | None = None
+        self.network = 0.0
+        self.disk = 0.0
+        self.started = time.monotonic()
+        self.logged = self.started
+        self.lock = threading.Lock()
+
+    def connected(self, latency: float):
+        """
+        Records the time it took for the server to answer, keeping the fastest answer.
+        """
+
+        with self.lock:
+            if self.latency is None or latency < self.latency:
+                self.latency = latency
+
+    def chunks(self, iterable):
+        """
+        Wraps an iterable of response chunks, applying the global bandwidth
+        limit and accounting for every chunk.
+        """
+
+        limit = throttle()
+        iterator = iter(iterable)
+        while True:
+            start = time.monotonic()
+            chunk = next(iterator, None)
+            if chunk is None:
+                return
+            received = time.monotonic()
+            limit.consume(len(chunk))
+            handed = time.monotonic()
+            yield chunk
+            self.update(len(chunk), received - start, time.monotonic() - handed)
+
+    def update(self, size: int, network: float = 0.0, disk: float = 0.0):
+        """
+        Adds a received chunk and logs the progress every few seconds.
+        """
+
+        with self.lock:
+            self.received += size
+            self.network += network
+            self.disk += disk
+            now = time.monotonic()
+            if now - self.logged < log_interval:
+                return
+            self.logged = now
+            done = self.offset + self.received
+            rate = self.received / max(now - self.started, 1e-6)
+        message = f"{self.name}: {format_size(done)}"
+        if self.total:
+            eta = (self.total - done) / rate if rate else 0
+            message += f" of {format_size(self.total)} ({done * 100 // self.total}%), ETA {eta:.0f}s"
+        logger.info(f"{message}, {format_size(rate)}/s")
+
+    def finish(self, ok: bool = True, **extra):
+        """
+        Logs a summary of the transfer and appends its metrics to the metrics file.
+
+        Parameters
+        ----------
+        ok : bool, optional
+            Whether the transfer completed successfully.
+        **extra
+            Additional fields to record.
+        """
+
+        elapsed = time.monotonic() - self.started
+        rate = self.received / max(elapsed, 1e-6)
+        if ok:
+            logger.debug(
+                f"Fetched {format_size(self.received)} of {self.name} in {elapsed:.1f}s ({format_size(rate)}/s)"
+            )
+        entry = {
+            "time": time.time(),
+            "name": self.name,
+            "source": self.source,
+            "url": self.url,
+            "host": self.host,
+            "ok": ok,
+            "bytes": self.received,
+            "resumed_from": self.offset,
+            "segments": self.segments,
+            "seconds": round(elapsed, 3),
+            "bytes_per_second": round(rate),
+            "latency": round(self.latency, 3) if self.latency is not None else None,
+            "network_seconds": round(self.network, 3),
+            "disk_seconds": round(self.disk, 3),
+            **extra,
+        }
+        record(entry)
+
+
+def record(entry: dict):
+    """
+    Appends an entry to the metrics file. Once the file reaches metrics_limit,
+    it replaces metrics.jsonl.1, so the metrics never take more than about
+    twice that.
+    """
+
+    try:
+        with _lock:
+            metrics_file.parent.mkdir(parents=True, exist_ok=True)
+            with open(metrics_file, "a") as f:
+                f.write(json.dumps(entry) + "\n")
+                full = f.tell() >= metrics_limit
+            if full:
+                os.replace(metrics_file, f"{metrics_file}.1")
+    except OSError:
+        logger.trace(f"Failed to write download metrics to {metrics_file}")
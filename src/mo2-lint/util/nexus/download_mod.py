@@ -1,11 +1,11 @@
 #!/usr/bin/env python3
 
 
-import certifi
 import requests
 from click import Path
 from loguru import logger
 from pydantic_core import from_json
+from util import retry
 from util import variables as var
 from util.nexus.api import api_key
 
@@ -47,7 +47,7 @@ def nexus_request(url: str) -> requests.Response:
 
     headers = header()
     logger.trace(f"Making Nexus API request to URL: {url}")
-    response = requests.get(url, headers=headers, verify=certifi.where())
+    response = retry.request(url, name="Nexus API request", headers=headers)
     logger.trace(f"Received response with status code: {response.status_code}")
     return response
 
@@ -84,10 +84,14 @@ def nexus_download(
     file_id: str,
     dest: Path,
     filename: str | None = None,
+    checksum: str | None = None,
 ) -> str:
     """
     Downloads a mod file from Nexus Mods to the specified destination.
 
+    The file is staged as `<filename>.part` and resumed on later calls if the
+    transfer is interrupted. It is only moved into place once complete and verified.
+
     Parameters
     ----------
     game_slug : str
@@ -100,6 +104,8 @@ def nexus_download(
         The destination path to save the downloaded file.
     filename : str, optional
         The name to save the file as. If not provided, the original filename will be used.
+    checksum : str, optional
+        The expected SHA-256 checksum of the file. If provided, the download is rejected on mismatch.
 
     Returns
     -------
@@ -148,12 +154,18 @@ def nexus_download(
         )
         return ""
     logger.trace(f"Downloading file from Nexus CDN URL: {download_url}")
-    with open(path, "wb") as f:
-        download = requests.get(
-            download_url, headers=header(), stream=True, verify=certifi.where()
-        )
-        for chunk in download.iter_content(chunk_size=8192):
-            if chunk:
-                f.write(chunk)
+    from util.download import fetch
+
+    retry.call(
+        filename,
+        retry.guarded,
+        download_url,
+        fetch,
+        download_url,
+        path,
+        checksum,
+        headers=header(),
+        source=f"nexus:{game_slug}/{mod_id}/{file_id}",
+    )
     logger.success(f"Downloaded file {filename} to {path}")
     return filename
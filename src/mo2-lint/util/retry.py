@@ -0,0 +1,378 @@
+#!/usr/bin/env python3
+
+import email.utils
+import random
+import threading
+import time
+from collections import Counter
+from datetime import UTC, datetime
+from urllib.parse import urlsplit
+
+import requests
+from loguru import logger
+from util import metrics
+from util import variables as var
+
+retry_statuses = frozenset({408, 416, 425, 429, 500, 502, 503, 504})
+
+_lock = threading.Lock()
+_breakers: dict[str, "CircuitBreaker"] = {}
+spent: Counter = Counter()
+
+
+class CircuitOpenError(Exception):
+    """
+    Raised instead of contacting a host that has failed repeatedly.
+    """
+
+
+class PermanentError(Exception):
+    """
+    Base for failures that repeating the same request can't fix, e.g. a file
+    whose size differs from the one in the config files.
+    """
+
+
+class CircuitBreaker:
+    """
+    Tracks consecutive failures of a single host.
+
+    After `threshold` consecutive failures the circuit opens and requests to
+    the host fail immediately for `cooldown` seconds. One request is then let
+    through; it closes the circuit if it succeeds and reopens it otherwise.
+    This keeps one dead host from stalling every parallel download that uses it.
+
+    Parameters
+    ----------
+    host : str
+        The host the breaker guards.
+    threshold : int
+        Consecutive failures after which the circuit opens.
+    cooldown : float
+        Seconds the circuit stays open.
+    """
+
+    def __init__(self, host: str, threshold: int, cooldown: float):
+        self.host = host
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.failures = 0
+        self.opened: float | None = None
+        self.lock = threading.Lock()
+
+    def allow(self) -> bool:
+        """
+        Returns whether a request to the host may be sent.
+        """
+
+        with self.lock:
+            if self.opened is None:
+                return True
+            if time.monotonic() - self.opened >= self.cooldown:
+                # half-open: let one request through
+                self.opened = time.monotonic()
+                return True
+            return False
+
+    def success(self):
+        with self.lock:
+            if self.opened is not None:
+                logger.info(f"{self.host} is responding again.")
+            self.failures = 0
+            self.opened = None
+
+    def failure(self):
+        with self.lock:
+            self.failures += 1
+            if self.failures >= self.threshold and self.opened is None:
+                logger.warning(
+                    f"{self.host} failed {self.failures} times in a row; skipping it for {self.cooldown:.0f}s."
+                )
+                self.opened = time.monotonic()
+            elif self.opened is not None:
+                self.opened = time.monotonic()
+
+
+def settings() -> var.RetrySettings:
+    return var.settings.download.retry if var.settings else var.RetrySettings()
+
+
+def breaker(url: str) -> CircuitBreaker:
+    """
+    Returns the circuit breaker of the host serving url.
+    """
+
+    host = urlsplit(url).netloc or urlsplit(url).scheme
+    with _lock:
+        if host not in _breakers:
+            policy = settings()
+            _breakers[host] = CircuitBreaker(
+                host, policy.breaker_threshold, policy.breaker_cooldown
+            )
+        return _breakers[host]
+
+
+def guarded(url: str, fn, *args, **kwargs):
+    """
+    Calls fn through the circuit breaker of the host serving url.
+
+    Raises
+    ------
+    CircuitOpenError
+        If the host is currently being skipped.
+    """
+
+    guard = breaker(url)
+    if not guard.allow():
+        raise CircuitOpenError(
+            f"{guard.host} is temporarily skipped after repeated failures."
+        )
+    try:
+        result = fn(*args, **kwargs)
+    except Exception as e:
+        if counts_against_host(e):
+            guard.failure()
+        else:
+            guard.success()
+        raise
+    guard.success()
+    return result
+
+
+def counts_against_host(error: Exception) -> bool:
+    """
+    Returns whether an error indicates the host itself is unhealthy, as
+    opposed to e.g. a missing file or a checksum mismatch.
+    """
+
+    if isinstance(error, requests.HTTPError) and error.response is not None:
+        return error.response.status_code >= 500
+    return isinstance(
+        error,
+        (
+            requests.ConnectionError,
+            requests.Timeout,
+            requests.exceptions.ChunkedEncodingError,
+        ),
+    )
+
+
+def retryable(error: Exception) -> bool:
+    """
+    Returns whether a failed attempt is worth repeating.
+    """
+
+    if isinstance(error, (CircuitOpenError, PermanentError)):
+        return False
+    if isinstance(error, requests.HTTPError) and error.response is not None:
+        return error.response.status_code in retry_statuses
+    return True
+
+
+def parse_time(value: str) -> float | None:
+    """
+    Parses an HTTP date or ISO 8601 timestamp into a Unix timestamp.
+    """
+
+    try:
+        return datetime.fromisoformat(value).timestamp()
+    except ValueError:
+        pass
+    try:
+        parsed = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=UTC)
+    return parsed.timestamp()
+
+
+def server_delay(response: requests.Response | None) -> float | None:
+    """
+    Returns how long a server asked clients to wait, in seconds.
+
+    Honors the standard Retry-After header (in seconds or as a date) and the
+    Nexus Mods X-RL-Hourly-* and X-RL-Daily-* rate limit headers.
+
+    Returns
+    -------
+    float | None
+        The requested delay, or None if the server didn't ask for one.
+    """
+
+    if response is None:
+        return None
+    headers = response.headers
+    if retry_after := headers.get("Retry-After"):
+        try:
+            return max(0.0, float(retry_after))
+        except ValueError:
+            if (when := parse_time(retry_after)) is not None:
+                return max(0.0, when - time.time())
+    for window in ("Hourly", "Daily"):
+        if headers.get(f"X-RL-{window}-Remaining") == "0":
+            reset = parse_time(headers.get(f"X-RL-{window}-Reset", ""))
+            if reset is not None:
+                return max(0.0, reset - time.time())
+    return None
+
+
+def backoff(attempt: int, policy: var.RetrySettings) -> float:
+    """
+    Returns a randomized exponential backoff delay for the given attempt (starting at 1).
+    """
+
+    return random.uniform(0, min(policy.max_delay, policy.backoff * 2**attempt))
+
+
+def delay(
+    attempt: int, policy: var.RetrySettings, response: requests.Response | None = None
+) -> float | None:
+    """
+    Returns how long to wait before the next attempt, or None if the server
+    asked for a longer wait than the policy allows.
+    """
+
+    requested = server_delay(response)
+    if requested is None:
+        return backoff(attempt, policy)
+    if requested > policy.max_wait:
+        return None
+    return requested + random.uniform(0, policy.backoff)
+
+
+def record(name: str, retries: int, ok: bool):
+    """
+    Counts the retries spent on a resource and records them in the metrics file.
+    """
+
+    if not retries:
+        return
+    with _lock:
+        spent[name] += retries
+    metrics.record({"time": time.time(), "name": name, "retries": retries, "ok": ok})
+
+
+def call(name: str, fn, *args, **kwargs):
+    """
+    Calls fn until it succeeds, waiting between attempts according to the
+    `[download.retry]` policy.
+
+    Parameters
+    ----------
+    name : str
+        Name of the resource, used in log messages and retry reports.
+    fn : callable
+        The function to call. Exceptions raised by it trigger a retry if they are retryable.
+    *args, **kwargs
+        Arguments passed to fn.
+
+    Returns
+    -------
+    any
+        The result of fn.
+
+    Raises
+    ------
+    Exception
+        The last error, once the attempts are exhausted or the error is not retryable.
+    """
+
+    policy = settings()
+    for attempt in range(1, policy.attempts + 1):
+        try:
+            result = fn(*args, **kwargs)
+        except Exception as e:
+            response = getattr(e, "response", None)
+            wait = delay(attempt, policy, response)
+            if attempt == policy.attempts or not retryable(e) or wait is None:
+                record(name, attempt - 1, False)
+                raise
+            logger.warning(
+                f"Attempt {attempt} of {policy.attempts} for {name} failed ({e}). Retrying in {wait:.1f}s."
+            )
+            time.sleep(wait)
+            continue
+        record(name, attempt - 1, True)
+        return result
+
+
+def request(url: str, name: str | None = None, **kwargs) -> requests.Response:
+    """
+    Sends a GET request through the shared session until the response is not
+    a retryable error status, honoring Retry-After and Nexus rate limit headers.
+
+    Unlike call(), an error response is returned to the caller once the
+    attempts are exhausted, so callers can still inspect its status code.
+
+    Parameters
+    ----------
+    url : str
+        The URL to request.
+    name : str, optional
+        Name of the request, used in log messages and retry reports. Defaults to url.
+    **kwargs
+        Passed on to util.http.get.
+
+    Returns
+    -------
+    requests.Response
+        The last response.
+    """
+
+    from util import http
+
+    name = name or url
+    policy = settings()
+    guard = breaker(url)
+    for attempt in range(1, policy.attempts + 1):
+        try:
+            if not guard.allow():
+                raise CircuitOpenError(
+                    f"{guard.host} is temporarily skipped after repeated failures."
+                )
+            response = http.get(url, **kwargs)
+        except Exception as e:
+            if counts_against_host(e):
+                guard.failure()
+            wait = delay(attempt, policy)
+            if attempt == policy.attempts or not retryable(e):
+                record(name, attempt - 1, False)
+                raise
+            logger.warning(
+                f"Request {attempt} of {policy.attempts} for {name} failed ({e}). Retrying in {wait:.1f}s."
+            )
+            time.sleep(wait)
+            continue
+        if response.status_code >= 500:
+            guard.failure()
+        else:
+            guard.success()
+        if response.status_code not in retry_statuses or attempt == policy.attempts:
+            record(name, attempt - 1, response.ok)
+            return response
+        wait = delay(attempt, policy, response)
+        if wait is None:
+            logger.error(
+                f"{name} is rate limited for longer than {policy.max_wait:.0f}s (HTTP {response.status_code})."
+            )
+            record(name, attempt - 1, False)
+            return response
+        logger.warning(
+            f"{name} returned HTTP {response.status_code}. Retrying in {wait:.1f}s."
+        )
+        response.close()
+        time.sleep(wait)
+    return response
+
+
+def report():
+    """
+    Logs how many retries were spent per resource.
+    """
+
+    with _lock:
+        if not spent:
+            return
+        summary = ", ".join(f"{name}: {count}" for name, count in spent.most_common())
+    logger.info(f"Retries spent: {summary}")
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Self
+
+from loguru import logger
+from util import variables as var
+
+
+class Scheduler:
+    """
+    Runs independent jobs (downloads, extractions) on a thread pool.
+
+    Jobs are started as soon as they are submitted; their results are collected
+    by name, so callers can apply them in a fixed order regardless of which job
+    finishes first. Exceptions (including SystemExit) raised by a job are
+    re-raised when its result is requested.
+
+    Parameters
+    ----------
+    workers : int, optional
+        Maximum number of jobs to run at once. Defaults to the `[download] workers` setting.
+    """
+
+    def __init__(self, workers: int | None = None):
+        if not workers:
+            workers = (
+                var.settings.download.workers
+                if var.settings
+                else var.DownloadSettings.workers
+            )
+        self.workers = workers
+        self.jobs: dict[str, Future] = {}
+        self.executor = ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix="mo2-lint"
+        )
+        logger.trace(f"Started scheduler with {workers} workers")
+
+    def submit(self, name: str, fn, *args, **kwargs) -> Future:
+        """
+        Starts a job in the background.
+
+        Parameters
+        ----------
+        name : str
+            Unique name of the job, used to retrieve its result.
+        fn : callable
+            The function to run.
+        *args, **kwargs
+            Arguments passed to fn.
+
+        Returns
+        -------
+        Future
+            The future tracking the job.
+        """
+
+        if name in self.jobs:
+            logger.trace(f"Job '{name}' already scheduled; reusing it.")
+            return self.jobs[name]
+        logger.trace(f"Scheduling job '{name}'")
+        self.jobs[name] = self.executor.submit(fn, *args, **kwargs)
+        return self.jobs[name]
+
+    def result(self, name: str):
+        """
+        Waits for a job to finish and returns its result.
+        """
+
+        logger.trace(f"Waiting for job '{name}'")
+        return self.jobs[name].result()
+
+    def wait(self) -> dict[str, any]:
+        """
+        Waits for every submitted job, in submission order.
+
+        Returns
+        -------
+        dict[str, any]
+            Job results keyed by job name.
+        """
+
+        return {name: self.result(name) for name in list(self.jobs)}
+
+    def shutdown(self):
+        """
+        Cancels jobs that have not started and waits for running ones.
+        """
+
+        self.executor.shutdown(wait=True, cancel_futures=True)
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(self, *exc):
+        self.shutdown()
+        return False
@@ -1,7 +1,7 @@
 #!/usr/bin/env python3
 
 import tomllib
-from dataclasses import dataclass, field
+from dataclasses import dataclass, field, replace
 from pathlib import Path
 from typing import Final
 
@@ -76,6 +76,84 @@ class GameSettings:
     script_extender_version: str | None = None
 
 
+@dataclass
+class RetrySettings:
+    """
+    Stores the retry policy for network requests.
+
+    Parameters
+    -----------
+    attempts : int
+        Maximum number of attempts per request or download.
+    backoff : float
+        Base delay in seconds. The delay before retry n is drawn at random
+        between 0 and backoff * 2^n (exponential backoff with full jitter).
+    max_delay : float
+        Upper bound for the computed backoff delay, in seconds.
+    max_wait : float
+        Longest delay requested by a server (Retry-After or Nexus rate limit
+        headers) that is honored, in seconds. Longer delays fail the request.
+    breaker_threshold : int
+        Consecutive failures after which a host is skipped.
+    breaker_cooldown : float
+        Seconds a failing host is skipped before it is tried again.
+    """
+
+    attempts: int = 5
+    backoff: float = 1.0
+    max_delay: float = 30.0
+    max_wait: float = 300.0
+    breaker_threshold: int = 5
+    breaker_cooldown: float = 60.0
+
+
+@dataclass
+class DownloadSettings:
+    """
+    Stores settings for fetching external resources.
+
+    Parameters
+    -----------
+    workers : int
+        Number of downloads and extractions to run concurrently.
+    extract_workers : int
+        Number of archives extracted at the same time, at most workers.
+        0 uses the number of CPU cores.
+    bandwidth_limit : int
+        Combined download bandwidth limit in KiB/s. 0 disables the limit.
+    mirrors : tuple[str], optional
+        Base URLs of mirrors holding copies of downloaded files under their
+        original names. Only used for files with a known checksum.
+    retry : RetrySettings
+        Retry policy for downloads and API requests.
+    """
+
+    workers: int = 4
+    extract_workers: int = 0
+    bandwidth_limit: int = 0
+    mirrors: tuple[str, ...] = ()
+    retry: RetrySettings = field(default_factory=RetrySettings)
+
+
+@dataclass
+class CacheSettings:
+    """
+    Stores settings for the download cache.
+
+    Parameters
+    -----------
+    max_size : int
+        Maximum size of the content store in MiB. Least recently used entries
+        are evicted once it is exceeded. 0 disables eviction.
+    shared_root : Path, optional
+        System-wide folder holding the content store, shared by every user
+        in its group. If unset, the store is kept in ~/.cache/mo2-lint.
+    """
+
+    max_size: int = 10240
+    shared_root: Path | None = None
+
+
 @dataclass
 class InstallerSettings:
     root_folder: Path | None = None
@@ -87,6 +165,8 @@ class InstallerSettings:
     refresh_configs: bool = True
     log_level: str | None = None
     games: dict[str, GameSettings] = field(default_factory=dict)
+    download: DownloadSettings = field(default_factory=DownloadSettings)
+    cache: CacheSettings = field(default_factory=CacheSettings)
 
 
 settings: InstallerSettings | None = None
@@ -134,6 +214,9 @@ def load_settings(path: Path | None = None):
     logger.trace(f"Parsed settings TOML: {toml_data}")
 
     installer = toml_data.get("installer", {}) or {}
+    download = toml_data.get("download", {}) or {}
+    cache = toml_data.get("cache", {}) or {}
+    retry = download.get("retry", {}) or {}
     instance = toml_data.get("instance", {}) or {}
     folders = instance.get("folders", {}) or {}
     root_folder = folders.get("root_folder") or installer.get("install_directory")
@@ -156,6 +239,38 @@ def load_settings(path: Path | None = None):
         refresh_configs=installer.get("refresh_configs", True),
         log_level=installer.get("log_level") or None,
         games=games,
+        download=DownloadSettings(
+            workers=max(1, int(download.get("workers") or DownloadSettings.workers)),
+            extract_workers=max(0, int(download.get("extract_workers") or 0)),
+            bandwidth_limit=max(0, int(download.get("bandwidth_limit") or 0)),
+            mirrors=tuple(download.get("mirrors") or ()),
+            retry=RetrySettings(
+                attempts=max(1, int(retry.get("attempts", RetrySettings.attempts))),
+                backoff=max(0.0, float(retry.get("backoff", RetrySettings.backoff))),
+                max_delay=max(
+                    0.0, float(retry.get("max_delay", RetrySettings.max_delay))
+                ),
+                max_wait=max(0.0, float(retry.get("max_wait", RetrySettings.max_wait))),
+                breaker_threshold=max(
+                    1,
+                    int(
+                        retry.get("breaker_threshold", RetrySettings.breaker_threshold)
+                    ),
+                ),
+                breaker_cooldown=max(
+                    0.0,
+                    float(
+                        retry.get("breaker_cooldown", RetrySettings.breaker_cooldown)
+                    ),
+                ),
+            ),
+        ),
+        cache=CacheSettings(
+            max_size=max(0, int(cache.get("max_size", CacheSettings.max_size))),
+            shared_root=Path(cache["shared_root"]).expanduser()
+            if cache.get("shared_root")
+            else None,
+        ),
     )
     logger.trace(f"Loaded settings: {settings}")
 
@@ -181,6 +296,9 @@ class DownloadData:
       checksum: "optional-checksum"
             ```
 
+        mirrors : list[str], optional
+            Alternative URLs serving the same file as the direct download, tried in order of latency.
+
         nexus : dict, optional
             Dictionary with 'mod' and 'file' keys, and optional 'checksum' key.\n
             Must be provided if direct data is not provided.\n
@@ -202,6 +320,7 @@ class DownloadData:
     checksum: str | None = None
     direct: str | dict[str, str] | None = None
     nexus: dict[str, int | str] | None = None
+    mirrors: tuple[str, ...] | None = None
 
     @classmethod
     def from_dict(cls, data: "dict[str, any] | DownloadData") -> "DownloadData":
@@ -211,6 +330,7 @@ class DownloadData:
             checksum=data.get("checksum") or None,
             direct=data.get("direct") or None,
             nexus=data.get("nexus") or None,
+            mirrors=tuple(data.get("mirrors")) if data.get("mirrors") else None,
         )
 
     def __post_init__(self):
@@ -651,24 +771,31 @@ def load_games_info(path: Path | None = None):
     logger.trace(f"Loaded games_info: {games_info}")
 
 
-def load_game_info(game_key: str):
+def resolve_game_info(game_key: str) -> "GameInfo":
     """
-    Loads information for a specific game into the global game_info variable.
+    Returns the information for a specific game, merged with its parent's.
+
+    The entries in games_info are left untouched, so several games can be
+    resolved in the same run.
 
     Parameters
     -----------
     game_key : str
         Key identifier for the game in the games_info dictionary.
+
+    Returns
+    -------
+    GameInfo
+        The resolved game information.
     """
-    global game_info
-    game_info = games_info[game_key]
-    logger.trace(f"Loaded game_info for key '{game_key}': {game_info}")
-    if game_info.parent and game_info.parent in games_info:
+    info = games_info[game_key]
+    logger.trace(f"Loaded game_info for key '{game_key}': {info}")
+    if info.parent and info.parent in games_info:
         # Backup child values
-        child_info = game_info
+        child_info = info
 
-        # Load parent info
-        game_info = games_info[game_info.parent]
+        # Copy parent info
+        info = replace(games_info[info.parent])
 
         # Override with child values
         for field_name in child_info.__dataclass_fields__:
@@ -679,18 +806,60 @@ def load_game_info(game_key: str):
             if child_value in (None, (), {}):
                 continue
 
-            parent_value = getattr(game_info, field_name)
+            parent_value = getattr(info, field_name)
             if isinstance(parent_value, dict) and isinstance(child_value, dict):
                 merged = dict(parent_value)
                 merged.update(child_value)
-                setattr(game_info, field_name, merged)
+                setattr(info, field_name, merged)
                 child_value = merged
             else:
-                setattr(game_info, field_name, child_value)
+                setattr(info, field_name, child_value)
             logger.debug(
-                f"Set game_info.{field_name} to {child_value} (inherited from parent '{game_info.parent}')"
+                f"Set game_info.{field_name} to {child_value} (inherited from parent '{child_info.parent}')"
             )
-    logger.trace(f"Final game_info for key '{game_key}': {game_info}")
+    logger.trace(f"Final game_info for key '{game_key}': {info}")
+    return info
+
+
+def load_game_info(game_key: str):
+    """
+    Loads information for a specific game into the global game_info variable.
+
+    Parameters
+    -----------
+    game_key : str
+        Key identifier for the game in the games_info dictionary.
+    """
+    global game_info
+    game_info = resolve_game_info(game_key)
+
+
+@dataclass
+class ManifestFile:
+    """
+    Stores the expected checksum and size of a file inside a resource archive.
+
+    Parameters
+    -----------
+    checksum : str
+        SHA-256 checksum of the file.
+    size : int, optional
+        Size of the file in bytes. Files of another size are rejected without being hashed.
+    """
+
+    checksum: str = None
+    size: int | None = None
+
+    @classmethod
+    def from_dict(cls, data: "dict[str, any] | str | ManifestFile") -> "ManifestFile":
+        if isinstance(data, cls):
+            return data
+        if isinstance(data, str):
+            return cls(checksum=data)
+        return cls(
+            checksum=data.get("checksum"),
+            size=int(data.get("size")) if data.get("size") is not None else None,
+        )
 
 
 @dataclass
@@ -712,6 +881,16 @@ class Resource:
         Version string for the resource.
     file_whitelist : FileWhitelist, optional
         File paths that should be included when installing the resource. If not provided, all files will be installed.
+    segments : int, optional
+        Number of parallel connections to split the download across, for large archives.
+    mirrors : tuple[str], optional
+        Alternative URLs serving the same file as download_url, tried in order of latency.
+    size : int, optional
+        Size of the resource file in bytes, checked before hashing and against the Content-Length of the download.
+    size_internal : int, optional
+        Size of the internal file at path_internal in bytes.
+    manifest : dict[str, ManifestFile], optional
+        Expected checksums and sizes of the extracted files, keyed by their path within the archive.
 
     Raises
     -------
@@ -725,6 +904,11 @@ class Resource:
     checksum_internal: str | None = None
     version: str | None = None
     file_whitelist: FileWhitelist | None = None
+    segments: int | None = None
+    mirrors: tuple[str, ...] | None = None
+    size: int | None = None
+    size_internal: int | None = None
+    manifest: dict[str, ManifestFile] | None = None
 
     @classmethod
     def from_dict(cls, data: "dict[str, any] | Resource") -> "Resource":
@@ -743,6 +927,18 @@ class Resource:
             file_whitelist=FileWhitelist.from_dict(data.get("file_whitelist"))
             if "file_whitelist" in data
             else None,
+            segments=int(data.get("segments")) if data.get("segments") else None,
+            mirrors=tuple(data.get("mirrors")) if data.get("mirrors") else None,
+            size=int(data.get("size")) if data.get("size") is not None else None,
+            size_internal=int(data.get("size_internal"))
+            if data.get("size_internal") is not None
+            else None,
+            manifest={
+                path: ManifestFile.from_dict(entry)
+                for path, entry in data.get("manifest").items()
+            }
+            if data.get("manifest")
+            else None,
         )
 
     def __post_init__(self):
@@ -3,7 +3,6 @@
 import os
 import re
 import shutil
-import stat
 import sys
 import threading
 from contextlib import contextmanager
@@ -12,6 +11,7 @@ from pathlib import Path
 from loguru import logger
 from protontricks.cli.main import main as pt
 from util import variables as var
+from util.cache import store
 
 from shared.logger import add_loggers, remove_loggers
 
@@ -94,8 +94,7 @@ def get_winetricks_path() -> Path | None:
 
     downloaded = Path("~/.cache/mo2-lint/downloads/winetricks").expanduser()
     if downloaded.exists():
-        downloaded.chmod(downloaded.stat().st_mode | stat.S_IEXEC)
-        return downloaded
+        return store.make_executable(downloaded)
     if path := shutil.which("winetricks"):
         return Path(path)
     return None